@@ -0,0 +1,96 @@
+import shutil
+import threading
+import time
+
+# Valeurs par défaut, remplaçables dans config.json (section "admission")
+DEFAULT_ADMISSION_SETTINGS = {
+    "max_queue_depth": 20,          # Soumissions en attente ou en cours de traitement
+    "user_rate_per_minute": 6,      # Soumissions par minute et par utilisateur
+    "user_burst": 3,                # Soumissions rapprochées tolérées
+    "min_free_disk_mb": 500         # Espace disque minimal à préserver
+}
+
+
+class SubmissionRejected(Exception):
+    """Soumission refusée temporairement: le client doit réessayer plus tard."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Seau à jetons: `capacity` soumissions rapprochées, puis `rate` par seconde."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def take(self):
+        """Consommer un jeton; retourne 0 en cas de succès, sinon le délai d'attente."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """Contrôle d'admission des soumissions: file bornée, débit par utilisateur et espace disque."""
+
+    def __init__(self, audio_dir, settings=None):
+        self.audio_dir = audio_dir
+        self.settings = dict(DEFAULT_ADMISSION_SETTINGS, **(settings or {}))
+        self.in_flight = 0
+        self.counters = {
+            "admitted": 0,
+            "rejected_queue_full": 0,
+            "rejected_rate_limited": 0,
+            "rejected_disk_full": 0
+        }
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _reject(self, counter, message, retry_after):
+        self.counters[counter] += 1
+        raise SubmissionRejected(message, retry_after)
+
+    def admit(self, user_id):
+        """Réserver une place dans la file ou lever SubmissionRejected."""
+        with self._lock:
+            if self.in_flight >= self.settings["max_queue_depth"]:
+                self._reject("rejected_queue_full", "File de traitement pleine", 10)
+
+            free_mb = shutil.disk_usage(self.audio_dir).free / (1024 * 1024)
+            if free_mb < self.settings["min_free_disk_mb"]:
+                self._reject("rejected_disk_full", "Espace disque insuffisant", 60)
+
+            bucket = self._buckets.get(user_id)
+            if bucket is None:
+                bucket = self._buckets[user_id] = TokenBucket(
+                    self.settings["user_rate_per_minute"] / 60,
+                    self.settings["user_burst"]
+                )
+            wait = bucket.take()
+            if wait:
+                self._reject("rejected_rate_limited", "Trop de soumissions rapprochées", max(1, round(wait)))
+
+            self.in_flight += 1
+            self.counters["admitted"] += 1
+
+    def track(self):
+        """Compter une soumission reprise au démarrage, sans contrôle d'admission."""
+        with self._lock:
+            self.in_flight += 1
+
+    def release(self):
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+
+    def status(self):
+        with self._lock:
+            return dict(self.counters, queue_depth=self.in_flight, max_queue_depth=self.settings["max_queue_depth"])
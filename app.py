@@ -1,45 +1,28 @@
 import gradio as gr
+import uvicorn
+from fastapi import FastAPI
 import pandas as pd
 import requests
 import os
-from data_manager import DataManager
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from catalogs import CatalogRegistry
+from previews import create_preview_router, sign_url
+from stats_api import StatsSnapshots, create_stats_router
+from admission import SubmissionRejected
+from segmentation import parse_boundaries
+from recording_status import is_active
 
-# Initialisation du gestionnaire de données
-data_manager = DataManager()
+# Registre des projets: chacun a son catalogue de versets, ses métadonnées, son plafond et son dataset
+catalogs = CatalogRegistry()
 
-def load_quran_verses():
-    try:
-        # Charger le fichier Excel en sautant la première ligne d'en-tête
-        df = pd.read_excel("moore_rwwad_v1.0.1-excel.1.xlsx", skiprows=1)
-        
-        # Définir les noms de colonnes
-        df.columns = ['id', 'sura', 'aya', 'translation', 'footnotes']
-        
-        # Nettoyer et convertir les types de données
-        df['id'] = df['id'].astype(int).astype(str)  # Convertir en int puis en str pour éviter les .0
-        df['sura'] = df['sura'].astype(int)
-        df['aya'] = df['aya'].astype(int)
-        
-        # Trier par sourate et verset
-        df = df.sort_values(by=['sura', 'aya'])
-        print(f"Fichier des versets chargé avec succès. {len(df)} versets trouvés.")
-        
-        # Afficher les premiers versets pour vérification
-        print("Premiers versets chargés:")
-        print(df[['sura', 'aya', 'translation']].head())
-        
-        return df
-    except Exception as e:
-        print(f"Erreur lors du chargement des versets: {str(e)}")
-        return None
-
-# Charger les données des versets
-verses_df = load_quran_verses()
+# Adresse du Hub (remplaçable par un serveur local pour les tests de charge)
+HF_ENDPOINT = os.getenv("HF_ENDPOINT", "https://huggingface.co").rstrip("/")
 
 def verify_hf_username(username):
     """Vérifie si le nom d'utilisateur HuggingFace existe."""
     try:
-        response = requests.get(f"https://huggingface.co/{username}")
+        response = requests.get(f"{HF_ENDPOINT}/{username}")
         return response.status_code == 200
     except:
         return False
@@ -50,15 +33,23 @@ def has_user_recorded_verse(user_id, verse_id, metadata):
 def get_verse_recording_count(verse_id, metadata):
     return sum(1 for r in metadata["recordings"] if r["verse_id"] == verse_id and r["status"] == "approved")
 
-def get_available_verse(user_id, metadata, verses_df):
+def format_verse_text(verse_info):
+    """Formater un verset pour l'affichage."""
+    return f"""Sourate {verse_info['sura']}, Verset {verse_info['aya']} (ID: {verse_info['id']})
+
+{verse_info['text']}"""
+
+def get_available_verses(user_id, metadata, catalog, limit=1, recorded_verses=None, exclude=()):
+    """Obtenir les `limit` prochains versets disponibles pour l'utilisateur dans un projet."""
+    verses_df = catalog.verses_df
     if verses_df is None:
         print("Erreur: Le fichier des versets n'a pas pu être chargé")
-        return None, None
+        return []
 
     try:
         # Obtenir les versets déjà enregistrés par l'utilisateur
-        user_recordings = [r for r in metadata["recordings"] if r["user_id"] == user_id]
-        recorded_verses = set(r["verse_id"] for r in user_recordings)
+        if recorded_verses is None:
+            recorded_verses = set(r["verse_id"] for r in metadata["recordings"] if r["user_id"] == user_id)
         
         # Compter les enregistrements approuvés par verset
         verse_counts = {}
@@ -66,87 +57,193 @@ def get_available_verse(user_id, metadata, verses_df):
             if recording["status"] == "approved":
                 verse_counts[recording["verse_id"]] = verse_counts.get(recording["verse_id"], 0) + 1
         
-        max_recordings = data_manager.get_max_recordings()
+        max_recordings = catalog.data_manager.get_max_recordings()
+        full_verses = {v for v, c in verse_counts.items() if c >= max_recordings}
         
-        # Parcourir les versets dans l'ordre du fichier
-        for _, verse in verses_df.iterrows():
-            verse_id = verse['id']  # Déjà converti en str lors du chargement
-            
-            # Vérifier si l'utilisateur a déjà enregistré ce verset
-            if verse_id in recorded_verses:
-                print(f"Verset {verse_id} déjà enregistré par l'utilisateur {user_id}")
-                continue
-            
-            # Vérifier le nombre d'enregistrements pour ce verset
-            current_count = verse_counts.get(verse_id, 0)
-            if current_count >= max_recordings:
-                print(f"Verset {verse_id} a déjà atteint le maximum d'enregistrements ({current_count}/{max_recordings})")
-                continue
-            
-            # Si le verset est disponible, le retourner
-            print(f"Attribution du verset {verse_id} à l'utilisateur {user_id}")
-            verse_info = {
-                'id': verse_id,
-                'sura': verse['sura'],
-                'aya': verse['aya'],
-                'text': verse['translation']
+        # Garder l'ordre du fichier en écartant les versets déjà enregistrés ou complets
+        skipped = set(recorded_verses) | full_verses | set(exclude)
+        available = verses_df[~verses_df['id'].isin(skipped)].head(limit)
+        
+        return [
+            {
+                'id': verse.id,
+                'sura': verse.sura,
+                'aya': verse.aya,
+                'text': verse.translation
             }
-            return verse_id, verse_info
-            
-        print(f"Aucun verset disponible pour l'utilisateur {user_id}")
-        return None, None
+            for verse in available.itertuples(index=False)
+        ]
         
     except Exception as e:
         print(f"Erreur lors de la recherche d'un verset disponible: {str(e)}")
+        return []
+
+def get_available_verse(user_id, metadata, catalog):
+    verses = get_available_verses(user_id, metadata, catalog)
+    if not verses:
+        print(f"Aucun verset disponible pour l'utilisateur {user_id}")
         return None, None
+    
+    verse_info = verses[0]
+    print(f"Attribution du verset {verse_info['id']} à l'utilisateur {user_id}")
+    return verse_info['id'], verse_info
+
+# Nombre de versets préchargés par session
+PREFETCH_SIZE = 5
+
+# Les sessions sont stockées dans gr.State; le verrou protège leur file d'attente
+# contre les rechargements effectués en arrière-plan
+_prefetch_lock = threading.Lock()
+_prefetch_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="prefetch")
+
+def new_session(username, metadata, catalog_name):
+    """Créer l'état de session d'un contributeur."""
+    return {
+        "username": username,
+        "catalog": catalog_name,
+        "current_verse": None,
+        "queue": [],
+        "recorded": set(r["verse_id"] for r in metadata["recordings"] if r["user_id"] == username),
+        "skipped": set(),
+        "jobs": [],
+        "refilling": False
+    }
+
+def _compute_queue(session, metadata, limit):
+    """Calculer les prochains versets éligibles qui ne sont pas déjà en file."""
+    with _prefetch_lock:
+        exclude = {v['id'] for v in session["queue"]}
+        if session["current_verse"]:
+            exclude.add(session["current_verse"]['id'])
+        skipped = set(session["skipped"])
+        recorded = set(session["recorded"])
+    
+    catalog = catalogs.get(session["catalog"])
+    verses = get_available_verses(session["username"], metadata, catalog, limit, recorded, exclude | skipped)
+    if not verses and skipped:
+        # Tous les versets restants ont été passés: les reproposer
+        with _prefetch_lock:
+            session["skipped"].clear()
+        verses = get_available_verses(session["username"], metadata, catalog, limit, recorded, exclude)
+    return verses
+
+def _refill_queue(session):
+    """Compléter la file de versets préchargés (exécuté en arrière-plan)."""
+    try:
+        metadata = catalogs.get(session["catalog"]).data_manager._load_full_metadata()
+        verses = _compute_queue(session, metadata, PREFETCH_SIZE - len(session["queue"]))
+        with _prefetch_lock:
+            queued = {v['id'] for v in session["queue"]}
+            session["queue"].extend(v for v in verses if v['id'] not in queued)
+    except Exception as e:
+        print(f"Erreur lors du préchargement des versets: {str(e)}")
+    finally:
+        session["refilling"] = False
+
+def _schedule_refill(session):
+    with _prefetch_lock:
+        if session["refilling"] or len(session["queue"]) >= PREFETCH_SIZE:
+            return
+        session["refilling"] = True
+    _prefetch_executor.submit(_refill_queue, session)
 
-def register_user(username, gender):
+def _next_rerecord(session):
+    """Verset rejeté à réenregistrer en priorité (consulté en mémoire, sans lire les métadonnées)."""
+    catalog = catalogs.get(session["catalog"])
+    with _prefetch_lock:
+        # Les versets déjà soumis dans la session sont retirés de la file une fois indexés
+        exclude = set(session["skipped"])
+        for entry in session["jobs"]:
+            exclude.update(v['id'] for v in entry.get("verses") or [entry["verse"]])
+        recorded = set(session["recorded"])
+    
+    data_manager = catalog.data_manager
+    entry = data_manager.rerecord_queue.next_for(session["username"], exclude, recorded, is_full=data_manager.is_verse_full)
+    return catalog.search.get(entry["verse_id"]) if entry else None
+
+def advance_session(session, metadata=None, skip_current=False):
+    """Passer au verset suivant de la session et relancer le préchargement."""
+    with _prefetch_lock:
+        if skip_current and session["current_verse"]:
+            session["skipped"].add(session["current_verse"]['id'])
+        session["current_verse"] = None
+    
+    # Les versets rejetés passent avant les versets préchargés
+    rerecord = _next_rerecord(session)
+    data_manager = catalogs.get(session["catalog"]).data_manager
+    with _prefetch_lock:
+        session["current_verse"] = rerecord
+        while session["current_verse"] is None and session["queue"]:
+            verse_info = session["queue"].pop(0)
+            # Un verset préchargé a pu atteindre le maximum depuis (autre contributeur, plafond abaissé)
+            if verse_info['id'] not in session["recorded"] and not data_manager.is_verse_full(verse_info['id']):
+                session["current_verse"] = verse_info
+    
+    if session["current_verse"] is None:
+        # File vide: calcul synchrone, le surplus alimente la file
+        if metadata is None:
+            metadata = catalogs.get(session["catalog"]).data_manager._load_full_metadata()
+        verses = _compute_queue(session, metadata, PREFETCH_SIZE + 1)
+        with _prefetch_lock:
+            if verses:
+                session["current_verse"] = verses[0]
+                session["queue"] = verses[1:]
+    
+    _schedule_refill(session)
+    return session["current_verse"]
+
+def register_user(username, gender, catalog_name=None):
     try:
         if not username or not gender:
-            return "Veuillez remplir tous les champs", None, None, gr.update(visible=False)
+            return "Veuillez remplir tous les champs", None, None, gr.update(visible=False), None
         
         # Simple vérification HuggingFace
         if not verify_hf_username(username):
-            return "Ce nom d'utilisateur HuggingFace n'existe pas", None, None, gr.update(visible=False)
+            return "Ce nom d'utilisateur HuggingFace n'existe pas", None, None, gr.update(visible=False), None
         
-        metadata = data_manager._load_full_metadata()
+        # Le catalogue du projet est chargé à sa première utilisation
+        catalog = catalogs.get(catalog_name)
+        if catalog.verses_df is None:
+            return "Les versets de ce projet ne sont pas disponibles pour le moment", None, None, gr.update(visible=False), None
+        data_manager = catalog.data_manager
         
-        # Vérifier si l'utilisateur existe déjà
-        if username in metadata["users"]:
-            print(f"L'utilisateur {username} existe déjà")
-        else:
-            metadata["users"][username] = {
-                "username": username,
-                "gender": gender
-            }
-            data_manager.save_metadata(metadata)
-            print(f"Nouvel utilisateur {username} enregistré")
+        with data_manager._metadata_lock:
+            metadata = data_manager._load_full_metadata()
+            
+            # Vérifier si l'utilisateur existe déjà
+            if username in metadata["users"]:
+                print(f"L'utilisateur {username} existe déjà")
+            else:
+                metadata["users"][username] = {
+                    "username": username,
+                    "gender": gender
+                }
+                data_manager.save_metadata(metadata)
+                print(f"Nouvel utilisateur {username} enregistré")
         
-        # Obtenir le premier verset disponible
-        verse_id, verse_info = get_available_verse(username, metadata, verses_df)
-        if verse_id and verse_info:
-            verse_text = f"""Sourate {verse_info['sura']}, Verset {verse_info['aya']} (ID: {verse_info['id']})
-
-{verse_info['text']}"""
+        # Obtenir le premier verset disponible et précharger les suivants
+        session = new_session(username, metadata, catalog.name)
+        verse_info = advance_session(session, metadata)
+        if verse_info:
+            verse_text = format_verse_text(verse_info)
             print(f"Verset attribué à {username}: Sourate {verse_info['sura']}, Verset {verse_info['aya']}")
         else:
             verse_text = "Aucun verset disponible pour le moment"
             print(f"Aucun verset disponible pour {username}")
             
-        return f"Inscription réussie! Bienvenue {username}", username, verse_text, gr.update(visible=True)
+        return f"Inscription réussie! Bienvenue {username}", username, verse_text, gr.update(visible=True), session
         
     except Exception as e:
         print(f"Erreur lors de l'inscription: {str(e)}")
-        return "Une erreur est survenue lors de l'inscription. Veuillez réessayer.", None, None, gr.update(visible=False)
+        return "Une erreur est survenue lors de l'inscription. Veuillez réessayer.", None, None, gr.update(visible=False), None
 
-def get_contributors_stats():
+def get_contributors_stats(metadata):
     """Obtenir les statistiques détaillées des contributeurs."""
-    metadata = data_manager._load_full_metadata()
     contributors = []
     
     for username, user_info in metadata["users"].items():
         # Filtrer les enregistrements de l'utilisateur
-        user_recordings = [r for r in metadata["recordings"] if r["user_id"] == username]
+        user_recordings = [r for r in metadata["recordings"] if r["user_id"] == username and is_active(r)]
         
         if user_recordings:
             # Trier les enregistrements par date pour avoir la dernière contribution
@@ -198,72 +295,183 @@ def format_contributors_table(contributors):
     
     return table
 
-def get_next_verse(username):
+def get_next_verse(session):
     """Obtenir le prochain verset disponible pour l'utilisateur."""
+    if not session:
+        return "Veuillez d'abord vous inscrire.", session
+    
     try:
-        metadata = data_manager._load_full_metadata()
-        verse_id, verse_info = get_available_verse(username, metadata, verses_df)
-        
-        if verse_id and verse_info:
-            verse_text = f"""Sourate {verse_info['sura']}, Verset {verse_info['aya']} (ID: {verse_info['id']})
-
-{verse_info['text']}"""
-            return verse_text
+        verse_info = advance_session(session, skip_current=True)
+        if verse_info:
+            return format_verse_text(verse_info), session
         else:
-            return "Aucun verset disponible pour le moment"
+            return "Aucun verset disponible pour le moment", session
             
     except Exception as e:
         print(f"Erreur lors de la recherche du prochain verset: {str(e)}")
-        return "Une erreur est survenue. Veuillez réessayer."
+        return "Une erreur est survenue. Veuillez réessayer.", session
+
+def format_search_choices(verses):
+    """Options de la liste de résultats: (libellé, ID du verset)."""
+    return [
+        (f"{v['sura']}:{v['aya']} — {v['text'][:80]}", v['id'])
+        for v in verses
+    ]
+
+def search_verses(query, session):
+    """Rechercher des versets par mots de la traduction ou des notes."""
+    verses = catalogs.get(session["catalog"]).search.search(query) if query and session else []
+    return gr.update(choices=format_search_choices(verses), value=None)
 
-def submit_recording(username, audio, verse_text):
-    """Soumettre manuellement un enregistrement."""
+def choose_verse(session, verse_id):
+    """Remplacer le verset courant par un verset choisi dans la recherche."""
+    if not session:
+        return "Veuillez d'abord vous inscrire.", None, session
+    
+    verse_info = catalogs.get(session["catalog"]).search.get(verse_id) if verse_id else None
+    current_text = format_verse_text(session["current_verse"]) if session["current_verse"] else None
+    if verse_info is None:
+        return "Veuillez choisir un verset dans les résultats.", current_text, session
+    data_manager = catalogs.get(session["catalog"]).data_manager
+    rerecord = data_manager.rerecord_queue.contains(session["username"], verse_info['id'])
+    if verse_info['id'] in session["recorded"] and not rerecord:
+        return "Vous avez déjà enregistré ce verset.", current_text, session
+    # Même critère que la file de versets proposés: les versets complets sont écartés
+    if data_manager.is_verse_full(verse_info['id']):
+        return "Ce verset a déjà atteint le nombre maximum d'enregistrements.", current_text, session
+    
+    with _prefetch_lock:
+        # Le verset courant reste proposé plus tard
+        if session["current_verse"]:
+            session["queue"].insert(0, session["current_verse"])
+        session["queue"] = [v for v in session["queue"] if v['id'] != verse_info['id']]
+        session["current_verse"] = verse_info
+    return f"Verset {verse_info['sura']}:{verse_info['aya']} sélectionné.", format_verse_text(verse_info), session
+
+def submit_recording(audio, session):
+    """Soumettre manuellement un enregistrement au nom de l'utilisateur de la session."""
+    if not session:
+        return "Veuillez d'abord vous inscrire.", "Aucun verset disponible pour le moment", session
+    verse_info = session["current_verse"]
+    verse_text = format_verse_text(verse_info) if verse_info else "Aucun verset disponible pour le moment"
+    
     if audio is None:
-        return "Veuillez d'abord enregistrer un verset.", verse_text
+        return "Veuillez d'abord enregistrer un verset.", verse_text, session
+    if verse_info is None:
+        return "Erreur: aucun verset en cours pour cette session", verse_text, session
         
     try:
-        # Extraire les informations du verset depuis le texte affiché
-        import re
-        match = re.match(r"Sourate (\d+), Verset (\d+) \(ID: (\d+)\)", verse_text)
-        if not match:
-            return "Erreur: impossible de récupérer les informations du verset", verse_text
-            
-        sura, aya, verse_id = map(int, match.groups())
-        
-        # Récupérer le texte du verset
-        verse_row = verses_df[verses_df['id'] == verse_id]
-        if verse_row.empty:
-            return "Erreur: verset non trouvé dans la base de données", verse_text
-            
-        verse_info = {
-            'id': str(verse_id),
-            'sura': sura,
-            'aya': aya,
-            'text': verse_row.iloc[0]['translation']
-        }
-        
-        success = data_manager.save_recording(audio, username, verse_info)
-        if success:
-            # Obtenir automatiquement le prochain verset
-            metadata = data_manager._load_full_metadata()
-            next_verse_id, next_verse_info = get_available_verse(username, metadata, verses_df)
-            if next_verse_id and next_verse_info:
-                next_verse_text = f"""Sourate {next_verse_info['sura']}, Verset {next_verse_info['aya']} (ID: {next_verse_info['id']})
-
-{next_verse_info['text']}"""
-                return "Enregistrement soumis avec succès!", next_verse_text
-            else:
-                return "Enregistrement soumis avec succès! Aucun autre verset disponible.", verse_text
+        # L'enregistrement est stocké durablement; le traitement se poursuit en arrière-plan
+        job = catalogs.get(session["catalog"]).data_manager.submit_recording(audio, session["username"], verse_info)
+        session["recorded"].add(verse_info['id'])
+        session["jobs"].append({"id": job["id"], "verse": verse_info})
+        
+        # Passer automatiquement au verset préchargé suivant
+        next_verse_info = advance_session(session)
+        if next_verse_info:
+            return "Enregistrement reçu! Traitement en cours...", format_verse_text(next_verse_info), session
         else:
-            return "Erreur lors de la soumission de l'enregistrement.", verse_text
+            return "Enregistrement reçu! Aucun autre verset disponible.", "Aucun verset disponible pour le moment", session
+    except SubmissionRejected as e:
+        # Saturation temporaire: le verset courant est conservé
+        return f"⏳ Serveur très sollicité ({str(e)}). Veuillez réessayer dans {e.retry_after} secondes.", verse_text, session
     except Exception as e:
         print(f"Erreur lors de la soumission: {str(e)}")
-        return f"Une erreur est survenue lors de la soumission: {str(e)}", verse_text
+        return f"Une erreur est survenue lors de la soumission: {str(e)}", verse_text, session
 
-def create_interface():
-    global verses_df
+def get_sura_verses(catalog, sura, aya_start=None, aya_end=None):
+    """Versets d'une sourate, éventuellement limités à une plage d'ayat."""
+    verses_df = catalog.verses_df
+    selection = verses_df[verses_df['sura'] == int(sura)]
+    if aya_start:
+        selection = selection[selection['aya'] >= int(aya_start)]
+    if aya_end:
+        selection = selection[selection['aya'] <= int(aya_end)]
+    return [
+        {'id': v.id, 'sura': v.sura, 'aya': v.aya, 'text': v.translation}
+        for v in selection.itertuples(index=False)
+    ]
+
+def submit_sura(audio, sura, aya_start, aya_end, session):
+    """Soumettre une prise couvrant une sourate entière ou une plage d'ayat, au nom de l'utilisateur de la session."""
+    if not session:
+        return "Veuillez d'abord vous inscrire.", session
+    if audio is None:
+        return "Veuillez d'abord enregistrer la sourate.", session
+    if not sura:
+        return "Veuillez indiquer le numéro de la sourate.", session
     
-    if verses_df is None:
+    username = session["username"]
+    catalog = catalogs.get(session["catalog"])
+    verses = get_sura_verses(catalog, sura, aya_start, aya_end)
+    if not verses:
+        return "Aucun verset ne correspond à cette sélection.", session
+    
+    # La prise couvre tous les versets, mais seuls ceux qui restent à enregistrer seront indexés
+    data_manager = catalog.data_manager
+    eligible = [
+        v for v in verses
+        if not data_manager.is_verse_full(v['id'])
+        and (v['id'] not in session["recorded"] or data_manager.rerecord_queue.contains(username, v['id']))
+    ]
+    if not eligible:
+        return "Tous les versets de cette sélection ont déjà été enregistrés ou ont atteint le nombre maximum d'enregistrements.", session
+    
+    try:
+        job = data_manager.submissions.submit_take(audio, username, verses)
+        session["recorded"].update(v['id'] for v in eligible)
+        session["jobs"].append({"id": job["id"], "verses": eligible})
+        return f"Prise reçue ({len(verses)} versets, dont {len(eligible)} à indexer). Découpage en cours...", session
+    except SubmissionRejected as e:
+        return f"⏳ Serveur très sollicité ({str(e)}). Veuillez réessayer dans {e.retry_after} secondes.", session
+    except Exception as e:
+        print(f"Erreur lors de la soumission de la sourate: {str(e)}")
+        return f"Une erreur est survenue lors de la soumission: {str(e)}", session
+
+# Nombre de soumissions affichées dans le suivi
+JOBS_DISPLAYED = 5
+
+def check_submissions(session):
+    """Suivre l'état des soumissions de la session."""
+    if not session or not session.get("jobs"):
+        return ""
+    
+    icons = {"queued": "⏳", "processing": "⚙️", "done": "✅", "failed": "❌"}
+    submissions = catalogs.get(session["catalog"]).data_manager.submissions
+    lines = []
+    for entry in session["jobs"]:
+        # Une soumission terminée n'est plus interrogée: son issue est gardée dans la session
+        if entry.get("status") not in ("done", "failed"):
+            job = submissions.get_job(entry["id"])
+            entry["status"] = job["status"] if job else "failed"
+            if entry["status"] == "failed":
+                entry["error"] = job["error"] if job else "soumission introuvable"
+        status = entry["status"]
+        verses = entry.get("verses") or [entry["verse"]]
+        
+        if status == "failed" and not entry.get("reported"):
+            # Reproposer les versets dont le traitement a échoué
+            entry["reported"] = True
+            with _prefetch_lock:
+                for verse_info in reversed(verses):
+                    session["recorded"].discard(verse_info['id'])
+                    session["queue"].insert(0, verse_info)
+        
+        if len(verses) > 1:
+            label = f"Sourate {verses[0]['sura']}, Versets {verses[0]['aya']} à {verses[-1]['aya']}"
+        else:
+            label = f"Sourate {verses[0]['sura']}, Verset {verses[0]['aya']}"
+        line = f"{icons.get(status, '')} {label}"
+        if status == "failed":
+            line += f" — échec ({entry['error']}), veuillez réenregistrer"
+        lines.append(line)
+    
+    return "\n".join(lines[-JOBS_DISPLAYED:])
+
+def create_interface():
+    # Le projet par défaut est chargé dès le démarrage; les autres à leur première utilisation
+    default_catalog = catalogs.get()
+    if default_catalog.verses_df is None:
         print("ERREUR: Impossible de charger le fichier des versets!")
         with gr.Blocks() as error_app:
             gr.Markdown("""
@@ -273,14 +481,17 @@ def create_interface():
             """)
         return error_app
     
-    print(f"Interface créée avec {len(verses_df)} versets chargés.")
+    print(f"Interface créée avec {len(default_catalog.verses_df)} versets chargés ({len(catalogs.names())} projet(s)).")
     
-    def record_verse(user_id, audio):
+    def record_verse(user_id, audio, catalog_name=None):
         if not user_id:
             return "ID utilisateur invalide", None
         if not audio:
             return "Aucun enregistrement détecté", None
         
+        catalog = catalogs.get(catalog_name)
+        data_manager = catalog.data_manager
+        verses_df = catalog.verses_df
         metadata = data_manager.load_metadata(user_id)
         
         # Vérifier d'abord s'il y a des versets à réenregistrer
@@ -291,46 +502,43 @@ def create_interface():
                 'id': verse['verse_id'],
                 'sura': verse['sura'],
                 'aya': verse['aya'],
-                'text': verses_df[verses_df['id'] == int(verse['verse_id'])]['translation'].iloc[0]
+                'text': verses_df[verses_df['id'] == verse['verse_id']]['translation'].iloc[0]
             }
-            recording_id = data_manager.save_recording(audio, user_id, verse_info)
-            data_manager.remove_verse_from_rerecord_list(user_id, verse['verse_id'])
+            # Le verset quitte la file de réenregistrement une fois le nouvel enregistrement indexé
+            job = data_manager.submit_recording(audio, user_id, verse_info)
             
             # Obtenir le prochain verset après le réenregistrement
-            next_verse_id, next_verse_info = get_available_verse(user_id, metadata, verses_df)
+            next_verse_id, next_verse_info = get_available_verse(user_id, metadata, catalog)
             if next_verse_id and next_verse_info:
-                next_verse_text = f"""Sourate {next_verse_info['sura']}, Verset {next_verse_info['aya']} (ID: {next_verse_info['id']})
-
-{next_verse_info['text']}"""
+                next_verse_text = format_verse_text(next_verse_info)
             else:
                 next_verse_text = "Aucun verset disponible pour le moment"
                 
-            return f"Réenregistrement sauvegardé avec succès pour la sourate {verse_info['sura']}, verset {verse_info['aya']}. En attente d'approbation.", next_verse_text
+            return f"Réenregistrement reçu pour la sourate {verse_info['sura']}, verset {verse_info['aya']} (traitement {job['id']}). En attente d'approbation.", next_verse_text
         
         if user_id not in metadata["users"]:
             return "ID utilisateur invalide", None
             
-        verse_id, verse_info = get_available_verse(user_id, metadata, verses_df)
+        verse_id, verse_info = get_available_verse(user_id, metadata, catalog)
         if not verse_id:
             return "Aucun verset disponible pour l'enregistrement", None
         
-        recording_id = data_manager.save_recording(audio, user_id, verse_info)
+        job = data_manager.submit_recording(audio, user_id, verse_info)
         
         # Obtenir automatiquement le prochain verset
-        next_verse_id, next_verse_info = get_available_verse(user_id, metadata, verses_df)
+        next_verse_id, next_verse_info = get_available_verse(user_id, metadata, catalog)
         if next_verse_id and next_verse_info:
-            next_verse_text = f"""Sourate {next_verse_info['sura']}, Verset {next_verse_info['aya']} (ID: {next_verse_info['id']})
-
-{next_verse_info['text']}"""
+            next_verse_text = format_verse_text(next_verse_info)
         else:
             next_verse_text = "Aucun verset disponible pour le moment"
         
-        return f"Enregistrement sauvegardé avec succès pour la sourate {verse_info['sura']}, verset {verse_info['aya']}. En attente d'approbation.", next_verse_text
+        return f"Enregistrement reçu pour la sourate {verse_info['sura']}, verset {verse_info['aya']} (traitement {job['id']}). En attente d'approbation.", next_verse_text
     
-    def display_user_stats(username):
+    def display_user_stats(username, catalog_name=None):
         if not username:
             return "Veuillez entrer votre nom d'utilisateur"
-            
+        
+        data_manager = catalogs.get(catalog_name).data_manager
         stats = data_manager.get_recording_stats(username)
         verses_to_rerecord = data_manager.get_verses_to_rerecord(username)
         
@@ -346,7 +554,9 @@ Total de vos enregistrements: {stats['total_recordings']}
 Enregistrements en attente: {stats['pending_recordings']}
 Enregistrements approuvés: {stats['approved_recordings']}{rerecord_info}"""
 
-    def display_admin_stats(username):
+    def display_admin_stats(username, catalog_name=None):
+        catalog = catalogs.get(catalog_name)
+        data_manager = catalog.data_manager
         if not data_manager.is_admin(username):
             return "Accès non autorisé", None
             
@@ -358,7 +568,7 @@ Enregistrements approuvés: {stats['approved_recordings']}{rerecord_info}"""
         user_stats = "\n".join([f"Utilisateur {u}: {c} enregistrements" 
                               for u, c in stats['recordings_per_user'].items()])
         
-        stats_text = f"""Statistiques globales:
+        stats_text = f"""Statistiques globales ({catalog.title}):
 Total des enregistrements: {stats['total_recordings']}
 Nombre d'utilisateurs: {stats['total_users']}
 Enregistrements par genre:
@@ -373,14 +583,30 @@ Statistiques par verset:
 Statistiques par utilisateur:
 {user_stats}"""
 
-        # Créer un DataFrame pour l'affichage du dataset
+        admission = data_manager.submissions.admission.status()
+        stats_text += f"""
+
+File de soumissions:
+En attente ou en cours: {admission['queue_depth']}/{admission['max_queue_depth']}
+Acceptées: {admission['admitted']}
+Refusées (file pleine): {admission['rejected_queue_full']}
+Refusées (débit utilisateur): {admission['rejected_rate_limited']}
+Refusées (espace disque): {admission['rejected_disk_full']}"""
+
         metadata = data_manager._load_full_metadata()
-        verses_df = load_quran_verses()
+        rerecord = data_manager.rerecord_queue.status()
+        stats_text += f"""
+
+Versets à réenregistrer: {rerecord['pending']} ({rerecord['users']} contributeur(s))"""
+
+        stats_text += "\n\n" + format_coverage(data_manager.audio_index.coverage(metadata))
+
+        # Créer un DataFrame pour l'affichage du dataset
+        translations = catalog.translations()
         
         dataset_rows = []
         for recording in metadata["recordings"]:
-            verse_row = verses_df[verses_df['id'] == int(recording["verse_id"])]
-            translation = verse_row.iloc[0]['translation'] if not verse_row.empty else "Non disponible"
+            translation = translations.get(recording["verse_id"], "Non disponible")
             
             dataset_rows.append({
                 "ID Enregistrement": recording["id"],
@@ -397,36 +623,170 @@ Statistiques par utilisateur:
         dataset_df = pd.DataFrame(dataset_rows)
         return stats_text, dataset_df.to_csv(index=False)
 
-    def sync_dataset(username):
+    def format_coverage(coverage):
+        sura_hours = "\n".join(f"Sourate {sura}: {hours:.2f} h" for sura, hours in coverage["per_sura"].items())
+        gender_hours = "\n".join(f"- {gender}: {hours:.2f} h" for gender, hours in coverage["per_gender"].items())
+        user_hours = "\n".join(f"Utilisateur {user}: {hours:.2f} h" for user, hours in coverage["per_user"].items())
+        
+        return f"""Couverture en heures (hors enregistrements rejetés):
+Total: {coverage['total_hours']:.2f} h
+Enregistrements non encore analysés: {coverage['missing_features']}
+Heures par genre:
+{gender_hours}
+
+Heures par sourate:
+{sura_hours}
+
+Heures par utilisateur:
+{user_hours}"""
+
+    def update_audio_index(username, catalog_name=None):
+        data_manager = catalogs.get(catalog_name).data_manager
+        if not data_manager.is_admin(username):
+            return "Accès non autorisé"
+        
+        scanned = data_manager.audio_index.update()
+        return f"Index audio mis à jour: {scanned} fichier(s) analysé(s)"
+
+    def sync_dataset(username, catalog_name=None):
+        data_manager = catalogs.get(catalog_name).data_manager
         if not data_manager.is_admin(username):
             return "Accès non autorisé"
         
-        success = data_manager.sync_to_huggingface()
+        success = data_manager.sync_to_huggingface(force=True)
         if success:
-            return "Dataset synchronisé avec succès sur HuggingFace!"
-        else:
-            return "Erreur lors de la synchronisation. Vérifiez les logs pour plus de détails."
+            return f"Dataset synchronisé avec succès sur HuggingFace! ({data_manager.HF_DATASET_REPO})"
+        
+        status = data_manager.hub_sync.status()
+        return f"""Erreur lors de la synchronisation. La publication reste en file d'attente et sera retentée automatiquement.
+Publications en attente: {status['pending']}
+État du disjoncteur: {status['circuit']}
+Dernière erreur: {status['last_error'] or 'aucune'}"""
 
-    def approve_recording(admin_username, recording_id):
+    def approve_recording(admin_username, recording_id, catalog_name=None):
         try:
-            data_manager.approve_recording(recording_id, admin_username)
+            catalogs.get(catalog_name).data_manager.approve_recording(recording_id, admin_username)
             return f"Enregistrement {recording_id} approuvé avec succès"
         except Exception as e:
             return str(e)
 
-    def reject_recording(admin_username, recording_id):
+    def reject_recording(admin_username, recording_id, catalog_name=None):
         try:
-            data_manager.reject_recording(recording_id, admin_username)
+            catalogs.get(catalog_name).data_manager.reject_recording(recording_id, admin_username)
             return f"Enregistrement {recording_id} rejeté avec succès"
         except Exception as e:
             return str(e)
 
-    def update_max_recordings(admin_username, new_max):
+    def list_recordings_for_review(admin_username, status_filter, catalog_name=None):
+        data_manager = catalogs.get(catalog_name).data_manager
+        if not data_manager.is_admin(admin_username):
+            return pd.DataFrame()
+        
+        recordings = data_manager._load_full_metadata()["recordings"]
+        if status_filter != "Tous":
+            recordings = [r for r in recordings if r["status"] == status_filter]
+        recordings = sorted(recordings, key=lambda r: r["timestamp"], reverse=True)[:200]
+        
+        return pd.DataFrame(
+            [[r["id"], r["sura"], r["aya"], r["user_id"], r["status"], r["timestamp"], r.get("segment", {}).get("take_id", "")] for r in recordings],
+            columns=["ID Enregistrement", "Sourate", "Verset", "Utilisateur", "Statut", "Date", "Prise"]
+        )
+
+    def select_recording(evt: gr.SelectData, recordings):
+        # Reporter l'ID de la ligne cliquée dans le champ de saisie
+        return recordings.iloc[evt.index[0]]["ID Enregistrement"]
+
+    def preview_recording(admin_username, recording_id, use_original, catalog_name=None):
+        catalog = catalogs.get(catalog_name)
+        if not catalog.data_manager.is_admin(admin_username):
+            return "Accès non autorisé"
+        if not recording_id:
+            return "Veuillez saisir l'ID de l'enregistrement"
+        
+        try:
+            catalog.data_manager.prepare_preview(recording_id, admin_username)
+        except Exception as e:
+            return f"Aperçu indisponible: {str(e)}"
+        
+        # Liens signés: les navigateurs téléchargent l'audio par plages (en-têtes Range) depuis ces routes
+        prefix = catalog.url_prefix
+        audio_url = sign_url(f"{prefix}/recordings/{recording_id}/original" if use_original else f"{prefix}/previews/{recording_id}.ogg")
+        waveform_url = sign_url(f"{prefix}/previews/{recording_id}.svg")
+        return f"""<div>
+<img src="{waveform_url}" alt="Forme d'onde" style="width:100%;max-width:480px"/>
+<audio controls preload="none" src="{audio_url}" style="width:100%;max-width:480px"></audio>
+</div>"""
+
+    def search_verses_admin(admin_username, query, catalog_name=None):
+        catalog = catalogs.get(catalog_name)
+        data_manager = catalog.data_manager
+        if not data_manager.is_admin(admin_username):
+            return pd.DataFrame()
+        
+        verses = catalog.search.search(query, limit=50) if query else []
+        counts = data_manager.get_recording_stats(admin_username)["recordings_per_verse"] if verses else {}
+        return pd.DataFrame(
+            [[v['id'], v['sura'], v['aya'], counts.get(v['id'], 0), v['text']] for v in verses],
+            columns=["ID", "Sourate", "Verset", "Enregistrements", "Texte"]
+        )
+
+    def load_take(admin_username, take_id, catalog_name=None):
+        catalog = catalogs.get(catalog_name)
+        try:
+            take = catalog.data_manager.get_take(take_id, admin_username)
+        except Exception as e:
+            return str(e), ""
+        
+        # Un verset absent de l'index garde sa ligne (une ligne par verset), avec son ID pour libellé
+        labels = []
+        for verse_id in take["verses"]:
+            verse = catalog.search.get(verse_id) if catalog.search else None
+            labels.append(f"{verse['sura']}:{verse['aya']}" if verse else f"#{verse_id}")
+        lines = "\n".join(
+            f"{label}  {start:.2f}-{end:.2f}"
+            for label, (start, end) in zip(labels, take["boundaries"])
+        )
+        return f"Prise de {take['user_id']}: {len(take['verses'])} versets, {len(take['recording_ids'])} extraits à valider", lines
+
+    def apply_take_boundaries(admin_username, take_id, boundaries_text, catalog_name=None):
+        try:
+            catalogs.get(catalog_name).data_manager.resegment_take(take_id, parse_boundaries(boundaries_text), admin_username)
+            return f"Bornes de la prise {take_id} mises à jour. Les extraits peuvent être réécoutés puis approuvés."
+        except Exception as e:
+            return str(e)
+
+    def restore_recording(admin_username, recording_id, catalog_name=None):
+        try:
+            catalogs.get(catalog_name).data_manager.restore_recording(recording_id, admin_username)
+            return f"Fichier audio de l'enregistrement {recording_id} restauré depuis l'archive"
+        except Exception as e:
+            return str(e)
+
+    def run_storage_lifecycle(admin_username, catalog_name=None):
         try:
-            data_manager.update_max_recordings(int(new_max), admin_username)
+            result = catalogs.get(catalog_name).data_manager.run_storage_lifecycle(admin_username)
+            return f"{result['archived']} fichier(s) archivé(s), {result['purged_archives']} archive(s) expirée(s) supprimée(s)"
+        except Exception as e:
+            return str(e)
+
+    def update_max_recordings(admin_username, new_max, catalog_name=None):
+        try:
+            catalogs.get(catalog_name).update_max_recordings(int(new_max), admin_username)
             return f"Nombre maximum d'enregistrements par verset mis à jour à {new_max}"
         except Exception as e:
             return str(e)
+    
+    def load_max_recordings(catalog_name):
+        return catalogs.get(catalog_name).data_manager.get_max_recordings()
+    
+    def catalog_selector():
+        # Le choix du projet n'est affiché que si plusieurs projets sont configurés
+        return gr.Dropdown(
+            choices=catalogs.choices(),
+            value=catalogs.default_name,
+            label="Projet",
+            visible=len(catalogs.names()) > 1
+        )
 
     with gr.Blocks() as app:
         gr.Markdown("""
@@ -442,6 +802,7 @@ Statistiques par utilisateur:
             with gr.Row():
                 username = gr.Textbox(label="Nom d'utilisateur HuggingFace")
                 gender = gr.Radio(choices=["Homme", "Femme"], label="Genre")
+                catalog_input = catalog_selector()
             register_btn = gr.Button("S'inscrire")
             registration_output = gr.Textbox(label="Statut de l'inscription")
             
@@ -453,25 +814,67 @@ Statistiques par utilisateur:
                 with gr.Row():
                     submit_btn = gr.Button("📤 Soumettre l'enregistrement")
                     next_verse_btn = gr.Button("⏭️ Verset suivant")
+                with gr.Accordion("Choisir un verset", open=False):
+                    verse_search_input = gr.Textbox(label="Rechercher dans la traduction (ou sourate:verset, ex. 2:255)")
+                    verse_search_results = gr.Dropdown(label="Résultats", choices=[])
+                    choose_verse_btn = gr.Button("Enregistrer ce verset")
+                with gr.Accordion("Enregistrer une sourate entière", open=False):
+                    gr.Markdown("Lisez les versets à la suite en marquant une courte pause entre chaque verset. L'enregistrement sera découpé automatiquement.")
+                    with gr.Row():
+                        sura_input = gr.Number(label="Sourate", precision=0)
+                        aya_start_input = gr.Number(label="Du verset (optionnel)", precision=0)
+                        aya_end_input = gr.Number(label="Au verset (optionnel)", precision=0)
+                    sura_recorder = gr.Audio(sources=["microphone"], type="filepath")
+                    submit_sura_btn = gr.Button("📤 Soumettre la sourate")
                 recording_status = gr.Textbox(label="Statut de l'enregistrement")
+                submissions_status = gr.Textbox(label="Suivi de mes soumissions", lines=JOBS_DISPLAYED)
+            
+            # État de session: verset courant, versets préchargés et versets déjà enregistrés
+            session_state = gr.State()
 
             # Événements
             register_btn.click(
                 register_user,
-                inputs=[username, gender],
-                outputs=[registration_output, username, verse_display, recording_section]
+                inputs=[username, gender, catalog_input],
+                outputs=[registration_output, username, verse_display, recording_section, session_state]
             )
             
             submit_btn.click(
                 submit_recording,
-                inputs=[username, audio_recorder, verse_display],
-                outputs=[recording_status, verse_display]
+                inputs=[audio_recorder, session_state],
+                outputs=[recording_status, verse_display, session_state]
             )
             
             next_verse_btn.click(
                 get_next_verse,
-                inputs=[username],
-                outputs=[verse_display]
+                inputs=[session_state],
+                outputs=[verse_display, session_state]
+            )
+            
+            verse_search_input.change(
+                search_verses,
+                inputs=[verse_search_input, session_state],
+                outputs=[verse_search_results]
+            )
+            
+            submit_sura_btn.click(
+                submit_sura,
+                inputs=[sura_recorder, sura_input, aya_start_input, aya_end_input, session_state],
+                outputs=[recording_status, session_state]
+            )
+            
+            choose_verse_btn.click(
+                choose_verse,
+                inputs=[session_state, verse_search_results],
+                outputs=[recording_status, verse_display, session_state]
+            )
+            
+            # Rafraîchir périodiquement le suivi des soumissions
+            app.load(
+                check_submissions,
+                inputs=[session_state],
+                outputs=[submissions_status],
+                every=3
             )
 
         with gr.Tab("Contributeurs"):
@@ -487,15 +890,22 @@ Statistiques par utilisateur:
             - 🌟 Débutant : Moins de 5 enregistrements approuvés
             """)
             
+            contributors_catalog = catalog_selector()
             contributors_display = gr.Markdown()
             refresh_btn = gr.Button("Rafraîchir la liste")
             
-            def update_contributors():
-                contributors = get_contributors_stats()
-                return format_contributors_table(contributors)
+            def update_contributors(catalog_name=None):
+                metadata = catalogs.get(catalog_name).data_manager._load_full_metadata()
+                return format_contributors_table(get_contributors_stats(metadata))
             
             refresh_btn.click(
                 update_contributors,
+                inputs=[contributors_catalog],
+                outputs=contributors_display
+            )
+            contributors_catalog.change(
+                update_contributors,
+                inputs=[contributors_catalog],
                 outputs=contributors_display
             )
             
@@ -504,13 +914,15 @@ Statistiques par utilisateur:
 
         with gr.Tab("Mes statistiques"):
             user_stats_input = gr.Textbox(label="Votre nom d'utilisateur HuggingFace")
+            user_stats_catalog = catalog_selector()
             show_stats_btn = gr.Button("Afficher mes statistiques")
             user_stats_output = gr.Textbox(label="Vos statistiques", lines=5)
             
-            show_stats_btn.click(display_user_stats, inputs=[user_stats_input], outputs=user_stats_output)
+            show_stats_btn.click(display_user_stats, inputs=[user_stats_input, user_stats_catalog], outputs=user_stats_output)
 
         with gr.Tab("Administration"):
             admin_username = gr.Textbox(label="Nom d'utilisateur administrateur")
+            admin_catalog = catalog_selector()
             
             with gr.Tab("Statistiques globales"):
                 show_admin_stats_btn = gr.Button("Afficher les statistiques globales")
@@ -519,9 +931,18 @@ Statistiques par utilisateur:
                 
                 show_admin_stats_btn.click(
                     display_admin_stats,
-                    inputs=[admin_username],
+                    inputs=[admin_username, admin_catalog],
                     outputs=[admin_stats_output, dataset_download]
                 )
+                
+                update_index_btn = gr.Button("Mettre à jour l'index audio (durées)")
+                update_index_output = gr.Textbox(label="Index audio")
+                
+                update_index_btn.click(
+                    update_audio_index,
+                    inputs=[admin_username, admin_catalog],
+                    outputs=update_index_output
+                )
             
             with gr.Tab("Dataset"):
                 gr.Markdown("""
@@ -532,50 +953,159 @@ Statistiques par utilisateur:
                 sync_btn = gr.Button("Synchroniser avec HuggingFace", variant="primary")
                 sync_output = gr.Textbox(label="Résultat de la synchronisation")
                 
-                # Lien vers le dataset
+                # Lien vers le dataset de chaque projet
+                dataset_links = "\n".join(
+                    f"- {title} : [https://huggingface.co/datasets/{catalogs.get(name).repository}](https://huggingface.co/datasets/{catalogs.get(name).repository})"
+                    for title, name in catalogs.choices()
+                )
                 gr.Markdown(f"""
                 ### Accéder au Dataset
-                Votre dataset est disponible sur HuggingFace à l'adresse suivante :
-                [https://huggingface.co/datasets/{data_manager.HF_DATASET_REPO}](https://huggingface.co/datasets/{data_manager.HF_DATASET_REPO})
+                Les datasets sont disponibles sur HuggingFace aux adresses suivantes :
+                
+{dataset_links}
                 """)
                 
                 sync_btn.click(
                     sync_dataset,
-                    inputs=[admin_username],
+                    inputs=[admin_username, admin_catalog],
                     outputs=sync_output
                 )
             
             with gr.Tab("Gestion des enregistrements"):
+                with gr.Row():
+                    status_filter = gr.Dropdown(
+                        choices=["Tous", "pending", "approved", "rejected"],
+                        value="Tous",
+                        label="Statut"
+                    )
+                    list_recordings_btn = gr.Button("Afficher les enregistrements")
+                recordings_table = gr.Dataframe(interactive=False)
                 recording_id_input = gr.Textbox(label="ID de l'enregistrement")
+                with gr.Row():
+                    use_original = gr.Checkbox(label="Écouter l'original (fichier complet, plus lent)", value=False)
+                    listen_btn = gr.Button("🎧 Écouter")
+                preview_output = gr.HTML()
                 with gr.Row():
                     approve_btn = gr.Button("Approuver")
                     reject_btn = gr.Button("Rejeter")
+                    restore_btn = gr.Button("Restaurer l'audio archivé")
                 recording_action_output = gr.Textbox(label="Résultat")
                 
                 approve_btn.click(
                     approve_recording,
-                    inputs=[admin_username, recording_id_input],
+                    inputs=[admin_username, recording_id_input, admin_catalog],
                     outputs=recording_action_output
                 )
                 reject_btn.click(
                     reject_recording,
-                    inputs=[admin_username, recording_id_input],
+                    inputs=[admin_username, recording_id_input, admin_catalog],
+                    outputs=recording_action_output
+                )
+                
+                restore_btn.click(
+                    restore_recording,
+                    inputs=[admin_username, recording_id_input, admin_catalog],
                     outputs=recording_action_output
                 )
+                
+                list_recordings_btn.click(
+                    list_recordings_for_review,
+                    inputs=[admin_username, status_filter, admin_catalog],
+                    outputs=recordings_table
+                )
+                recordings_table.select(
+                    select_recording,
+                    inputs=[recordings_table],
+                    outputs=recording_id_input
+                )
+                listen_btn.click(
+                    preview_recording,
+                    inputs=[admin_username, recording_id_input, use_original, admin_catalog],
+                    outputs=preview_output
+                )
+            
+            with gr.Tab("Découpage des sourates"):
+                gr.Markdown("""
+                Les prises couvrant plusieurs versets sont découpées automatiquement aux pauses.
+                Ajustez les bornes (en secondes, une ligne par verset) avant d'approuver les extraits.
+                """)
+                take_id_input = gr.Textbox(label="ID de la prise (take_...)")
+                load_take_btn = gr.Button("Charger la prise")
+                take_info_output = gr.Textbox(label="Prise")
+                take_boundaries = gr.Textbox(label="Bornes (sourate:verset début-fin)", lines=10)
+                apply_boundaries_btn = gr.Button("Appliquer les bornes")
+                take_action_output = gr.Textbox(label="Résultat")
+                
+                load_take_btn.click(
+                    load_take,
+                    inputs=[admin_username, take_id_input, admin_catalog],
+                    outputs=[take_info_output, take_boundaries]
+                )
+                apply_boundaries_btn.click(
+                    apply_take_boundaries,
+                    inputs=[admin_username, take_id_input, take_boundaries, admin_catalog],
+                    outputs=take_action_output
+                )
+            
+            with gr.Tab("Recherche de versets"):
+                admin_search_input = gr.Textbox(label="Rechercher dans la traduction et les notes (ou sourate:verset)")
+                admin_search_results = gr.Dataframe(interactive=False, wrap=True)
+                
+                admin_search_input.change(
+                    search_verses_admin,
+                    inputs=[admin_username, admin_search_input, admin_catalog],
+                    outputs=admin_search_results
+                )
             
             with gr.Tab("Paramètres"):
-                max_recordings_input = gr.Number(label="Nombre maximum d'enregistrements par verset", value=data_manager.get_max_recordings())
+                max_recordings_input = gr.Number(label="Nombre maximum d'enregistrements par verset", value=default_catalog.data_manager.get_max_recordings())
                 update_max_btn = gr.Button("Mettre à jour")
                 update_max_output = gr.Textbox(label="Résultat")
                 
                 update_max_btn.click(
                     update_max_recordings,
-                    inputs=[admin_username, max_recordings_input],
+                    inputs=[admin_username, max_recordings_input, admin_catalog],
                     outputs=update_max_output
                 )
+                admin_catalog.change(
+                    load_max_recordings,
+                    inputs=[admin_catalog],
+                    outputs=max_recordings_input
+                )
+                
+                gr.Markdown(f"""
+                ### Stockage
+                Les enregistrements rejetés ou remplacés sont archivés (FLAC) après {default_catalog.data_manager.lifecycle.settings['grace_days']} jours
+                et supprimés définitivement après {default_catalog.data_manager.lifecycle.settings['retention_days']} jours d'archivage.
+                """)
+                lifecycle_btn = gr.Button("Lancer le nettoyage du stockage")
+                lifecycle_output = gr.Textbox(label="Résultat")
+                
+                lifecycle_btn.click(
+                    run_storage_lifecycle,
+                    inputs=[admin_username, admin_catalog],
+                    outputs=lifecycle_output
+                )
 
     return app
 
 if __name__ == "__main__":
+    # Reprendre les traitements interrompus et les publications restées en attente de chaque projet
+    catalogs.start_background_tasks()
     app = create_interface()
-    app.launch(share=True) 
\ No newline at end of file
+    
+    # Les aperçus et l'API sont servis par des routes dédiées, montées à côté de l'interface Gradio;
+    # les routes d'un projet autre que celui par défaut sont préfixées par /projects/<nom>
+    server = FastAPI()
+    for name in catalogs.names():
+        catalog = catalogs.get(name)
+        server.include_router(create_preview_router(catalog.data_manager), prefix=catalog.url_prefix)
+        
+        # API JSON publique servie depuis des instantanés recalculés après chaque modification
+        stats_snapshots = StatsSnapshots(catalog, get_contributors_stats)
+        catalog.data_manager.metadata_listeners.append(stats_snapshots.invalidate)
+        if name == catalogs.default_name:
+            stats_snapshots.invalidate()
+        server.include_router(create_stats_router(stats_snapshots), prefix=catalog.url_prefix)
+    server = gr.mount_gradio_app(server, app, path="/")
+    uvicorn.run(server, host="0.0.0.0", port=int(os.getenv("PORT", 7860)))
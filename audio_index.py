@@ -0,0 +1,176 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import soundfile as sf
+from recording_status import INACTIVE_STATUSES
+
+# Colonnes de l'index des caractéristiques audio
+COLUMNS = ["file", "mtime", "size", "duration", "sample_rate", "loudness_db", "speech_ratio"]
+
+# Fenêtre d'analyse pour la détection de parole (en secondes)
+FRAME_SECONDS = 0.03
+
+# En dessous de ce nombre de fichiers à analyser, l'analyse se fait dans le processus courant
+POOL_MIN_FILES = 8
+
+
+def extract_features(path, file=None):
+    """Calculer durée, fréquence d'échantillonnage, volume et taux de parole d'un fichier.
+
+    `file` est la clé du fichier dans l'index (son nom par défaut).
+    """
+    stat = os.stat(path)
+    features = {
+        "file": file or Path(path).name,
+        "mtime": stat.st_mtime,
+        "size": stat.st_size,
+        "duration": 0.0,
+        "sample_rate": 0,
+        "loudness_db": float("nan"),
+        "speech_ratio": 0.0
+    }
+    try:
+        data, sample_rate = sf.read(path, dtype="float32", always_2d=True)
+    except Exception as e:
+        print(f"Fichier audio illisible {path}: {str(e)}")
+        return features
+
+    samples = data.mean(axis=1)
+    features["sample_rate"] = sample_rate
+    features["duration"] = len(samples) / sample_rate if sample_rate else 0.0
+    if len(samples) == 0:
+        return features
+
+    rms = np.sqrt(np.mean(samples ** 2))
+    features["loudness_db"] = float(20 * np.log10(max(rms, 1e-10)))
+
+    # Énergie par trame; une trame est de la parole si elle dépasse le bruit de fond de 15 dB
+    frame = max(1, int(sample_rate * FRAME_SECONDS))
+    n_frames = len(samples) // frame
+    if n_frames:
+        frames = samples[:n_frames * frame].reshape(n_frames, frame)
+        frame_db = 20 * np.log10(np.maximum(np.sqrt(np.mean(frames ** 2, axis=1)), 1e-10))
+        threshold = max(np.percentile(frame_db, 10) + 15, -50)
+        features["speech_ratio"] = float(np.mean(frame_db > threshold))
+    return features
+
+
+class AudioFeatureIndex:
+    """Index en colonnes (Parquet) des caractéristiques des fichiers audio.
+
+    Seuls les fichiers nouveaux ou modifiés (taille ou date) sont analysés lors
+    d'une mise à jour; l'analyse est répartie sur un pool de processus.
+    `request_update` met l'index à jour en arrière-plan après chaque
+    indexation, les demandes arrivées pendant une mise à jour étant regroupées.
+    Les fichiers sont indexés par leur chemin relatif à `base_dir` (le dossier
+    du projet), ce qui distingue les fichiers de même nom de projets différents.
+    """
+
+    def __init__(self, index_file, audio_dir, base_dir="."):
+        self.index_file = Path(index_file)
+        self.audio_dir = Path(audio_dir)
+        self.base_dir = Path(base_dir)
+        self._lock = threading.Lock()
+        self._index = None
+        self._state_lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._updating = False
+
+    def _key(self, path):
+        """Clé d'un fichier dans l'index: son chemin relatif au dossier du projet."""
+        return Path(os.path.relpath(Path(path).resolve(), self.base_dir.resolve())).as_posix()
+
+    def load(self):
+        """Charger l'index (gardé en mémoire après la première lecture)."""
+        if self._index is None:
+            if self.index_file.exists():
+                self._index = pd.read_parquet(self.index_file)
+            else:
+                self._index = pd.DataFrame(columns=COLUMNS)
+        return self._index
+
+    def request_update(self):
+        """Demander une mise à jour incrémentale en arrière-plan (sans attendre)."""
+        self._dirty.set()
+        with self._state_lock:
+            if self._updating:
+                return
+            self._updating = True
+        threading.Thread(target=self._update_loop, name="audio-index", daemon=True).start()
+
+    def _update_loop(self):
+        while True:
+            while self._dirty.is_set():
+                self._dirty.clear()
+                try:
+                    self.update()
+                except Exception as e:
+                    print(f"Erreur lors de la mise à jour de l'index audio: {str(e)}")
+            with self._state_lock:
+                if not self._dirty.is_set():
+                    self._updating = False
+                    return
+
+    def update(self, max_workers=None):
+        """Analyser les fichiers ajoutés depuis la dernière mise à jour."""
+        with self._lock:
+            index = self.load()
+            files = {self._key(p): p for p in self.audio_dir.glob("*.wav")}
+            known = {
+                row.file: (row.mtime, row.size)
+                for row in index.itertuples(index=False)
+            }
+
+            to_scan = []
+            for key, path in files.items():
+                stat = path.stat()
+                if known.get(key) != (stat.st_mtime, stat.st_size):
+                    to_scan.append(key)
+
+            # Retirer les fichiers disparus ou à réanalyser
+            keep = index["file"].isin(files.keys()) & ~index["file"].isin(to_scan)
+            index = index[keep]
+
+            if len(to_scan) < POOL_MIN_FILES:
+                # Mise à jour après une soumission: démarrer un pool coûterait plus que l'analyse
+                rows = [extract_features(str(files[key]), key) for key in to_scan]
+            else:
+                # "spawn": les processus ne doivent pas hériter des threads du serveur (verrous, pools)
+                with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+                    rows = list(executor.map(extract_features, [str(files[k]) for k in to_scan], to_scan, chunksize=16))
+            if rows:
+                index = pd.concat([index, pd.DataFrame(rows, columns=COLUMNS)], ignore_index=True)
+
+            if to_scan or not keep.all():
+                tmp_file = self.index_file.with_suffix(".tmp")
+                index.to_parquet(tmp_file, index=False)
+                os.replace(tmp_file, self.index_file)
+
+            self._index = index.reset_index(drop=True)
+            return len(to_scan)
+
+    def coverage(self, metadata):
+        """Heures enregistrées (hors enregistrements rejetés ou retirés) par sourate, genre et contributeur."""
+        recordings = pd.DataFrame(metadata["recordings"], columns=["audio_path", "sura", "gender", "user_id", "status"])
+        recordings = recordings[~recordings["status"].isin(INACTIVE_STATUSES)]
+        recordings["file"] = recordings["audio_path"].map(self._key)
+
+        merged = recordings.merge(self.load()[["file", "duration"]], on="file", how="left")
+        merged["hours"] = merged["duration"].astype(float).fillna(0.0) / 3600
+
+        return {
+            "total_hours": merged["hours"].sum(),
+            "missing_features": int(merged["duration"].isna().sum()),
+            "per_sura": merged.groupby("sura")["hours"].sum().sort_index(),
+            "per_gender": merged.groupby("gender")["hours"].sum(),
+            "per_user": merged.groupby("user_id")["hours"].sum().sort_values(ascending=False)
+        }
+
+
+if __name__ == "__main__":
+    index = AudioFeatureIndex("audio_features.parquet", "audio_recordings", ".")
+    print(f"{index.update()} fichiers analysés")
@@ -0,0 +1,185 @@
+import json
+import os
+import threading
+from pathlib import Path
+import pandas as pd
+from data_manager import DataManager
+from hub_sync import HubSync
+from search_index import VerseSearchIndex
+
+# Projet créé par défaut: le catalogue Mooré d'origine et les données déjà présentes à la racine
+DEFAULT_CATALOGS = {
+    "default": "moore",
+    "catalogs": {
+        "moore": {
+            "title": "Mooré (Rwwad v1.0.1)",
+            "verses_file": "moore_rwwad_v1.0.1-excel.1.xlsx",
+            "repository": "sheickydollar/quran-audio-moore",
+            "max_recordings_per_verse": 5,
+            "data_dir": "."
+        }
+    }
+}
+
+
+def load_verses(verses_file):
+    """Charger un catalogue de versets (id, sourate, aya, traduction, notes)."""
+    try:
+        # Charger le fichier Excel en sautant la première ligne d'en-tête
+        df = pd.read_excel(verses_file, skiprows=1)
+
+        # Définir les noms de colonnes
+        df.columns = ['id', 'sura', 'aya', 'translation', 'footnotes']
+
+        # Nettoyer et convertir les types de données
+        df['id'] = df['id'].astype(int).astype(str)  # Convertir en int puis en str pour éviter les .0
+        df['sura'] = df['sura'].astype(int)
+        df['aya'] = df['aya'].astype(int)
+
+        # Trier par sourate et verset
+        df = df.sort_values(by=['sura', 'aya'])
+        print(f"Fichier des versets {verses_file} chargé avec succès. {len(df)} versets trouvés.")
+        return df
+    except Exception as e:
+        print(f"Erreur lors du chargement des versets ({verses_file}): {str(e)}")
+        return None
+
+
+class Catalog:
+    """Projet d'enregistrement: catalogue de versets, métadonnées, plafond et dataset cible.
+
+    Le fichier des versets et son index de recherche ne sont chargés qu'à la
+    première utilisation; le gestionnaire de données du projet travaille dans
+    son propre dossier (`data_dir`) et publie via la file partagée. Les
+    chemins relatifs de la configuration sont résolus par rapport au dossier
+    du registre (`base_dir`), et non au dossier courant.
+    """
+
+    def __init__(self, name, settings, hub_sync, is_default=False, base_dir=".", on_change=None):
+        self.name = name
+        self.settings = settings
+        self._on_change = on_change
+        self.title = settings.get("title", name)
+        base_dir = Path(base_dir)
+        self.verses_file = base_dir / settings["verses_file"]
+        self.repository = settings["repository"]
+        self.data_dir = base_dir / settings.get("data_dir", os.path.join("projects", name))
+        # Les routes HTTP du projet par défaut restent à la racine
+        self.url_prefix = "" if is_default else f"/projects/{name}"
+        self._hub_sync = hub_sync
+        self._verses_lock = threading.Lock()
+        self._data_lock = threading.Lock()
+        self._verses_loaded = False
+        self._verses_df = None
+        self._search = None
+        self._data_manager = None
+
+    def _load_verses(self):
+        with self._verses_lock:
+            if not self._verses_loaded:
+                self._verses_df = load_verses(self.verses_file)
+                self._search = VerseSearchIndex(self._verses_df) if self._verses_df is not None else None
+                self._verses_loaded = True
+
+    @property
+    def verses_df(self):
+        """Versets du catalogue (None si le fichier n'a pas pu être chargé)."""
+        self._load_verses()
+        return self._verses_df
+
+    @property
+    def search(self):
+        """Index de recherche plein texte des versets."""
+        self._load_verses()
+        return self._search
+
+    @property
+    def data_manager(self):
+        with self._data_lock:
+            if self._data_manager is None:
+                self._data_manager = DataManager(
+                    self.data_dir,
+                    repository=self.repository,
+                    max_recordings=self.settings.get("max_recordings_per_verse"),
+                    hub_sync=self._hub_sync,
+                    load_translations=self.translations
+                )
+            return self._data_manager
+
+    def update_max_recordings(self, new_max, username):
+        """Modifier le plafond par verset du projet et l'enregistrer dans `catalogs.json`."""
+        self.data_manager.update_max_recordings(new_max, username)
+        self.settings["max_recordings_per_verse"] = new_max
+        if self._on_change:
+            self._on_change()
+
+    def translations(self):
+        """Traductions des versets, indexées par ID de verset."""
+        if self.verses_df is None:
+            raise ValueError(f"Le fichier des versets {self.verses_file} n'a pas pu être chargé")
+        return dict(zip(self.verses_df['id'], self.verses_df['translation']))
+
+
+class CatalogRegistry:
+    """Registre des projets servis par le même processus.
+
+    Les projets sont décrits dans `catalogs.json`. Ils partagent une seule file
+    de publication vers HuggingFace (et donc un seul planificateur), chaque
+    demande étant associée au dépôt cible de son projet.
+    """
+
+    def __init__(self, base_dir=".", config_file="catalogs.json"):
+        self.base_dir = Path(base_dir)
+        self.config_file = self.base_dir / config_file
+
+        self._config_lock = threading.Lock()
+        if not self.config_file.exists():
+            self.config = DEFAULT_CATALOGS
+            self.save_config()
+        with open(self.config_file, 'r', encoding='utf-8') as f:
+            self.config = json.load(f)
+
+        self.default_name = self.config.get("default") or next(iter(self.config["catalogs"]))
+        self.hub_sync = HubSync(self.base_dir, self._build_dataset, token=os.getenv("HUGGINGFACE_TOKEN"))
+        self._catalogs = {
+            name: Catalog(name, settings, self.hub_sync, is_default=(name == self.default_name),
+                          base_dir=self.base_dir, on_change=self.save_config)
+            for name, settings in self.config["catalogs"].items()
+        }
+
+    def save_config(self):
+        """Enregistrer `catalogs.json` (écriture atomique)."""
+        with self._config_lock:
+            tmp_file = self.config_file.with_suffix(".tmp")
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.config, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.config_file)
+
+    def names(self):
+        return list(self._catalogs)
+
+    def choices(self):
+        """Options d'une liste déroulante: (titre, nom du projet)."""
+        return [(catalog.title, name) for name, catalog in self._catalogs.items()]
+
+    def get(self, name=None):
+        """Obtenir un projet par son nom (le projet par défaut si aucun nom n'est donné)."""
+        catalog = self._catalogs.get(name or self.default_name)
+        if catalog is None:
+            raise ValueError(f"Projet inconnu: {name}")
+        return catalog
+
+    def _build_dataset(self, repo_id):
+        for catalog in self._catalogs.values():
+            if catalog.repository == repo_id:
+                return catalog.data_manager.create_huggingface_dataset()
+        raise ValueError(f"Aucun projet ne publie vers {repo_id}")
+
+    def start_background_tasks(self):
+        """Reprendre les traitements interrompus de chaque projet et lancer les tâches périodiques.
+
+        Les gestionnaires de données sont créés pour tous les projets afin de
+        reprendre leurs soumissions; les versets restent chargés à la demande.
+        """
+        for catalog in self._catalogs.values():
+            catalog.data_manager.start_background_tasks()
@@ -3,42 +3,97 @@ import json
 from pathlib import Path
 from datetime import datetime
 import shutil
+import threading
 import pandas as pd
+import soundfile as sf
 from huggingface_hub import HfApi, create_repo, upload_file
-from datasets import Dataset, Audio
 import requests
+from hub_sync import HubSync
+from submission_pipeline import SubmissionPipeline
+from admission import DEFAULT_ADMISSION_SETTINGS
+from storage_lifecycle import StorageLifecycle, DEFAULT_STORAGE_SETTINGS
+from rerecord_queue import RerecordQueue, DEFAULT_RERECORD_SETTINGS
+from dataset_cache import DatasetCache
+from audio_index import AudioFeatureIndex
+from previews import PreviewStore
+from segmentation import validate_boundaries
+from recording_status import INACTIVE_STATUSES, is_active
 
 class DataManager:
-    def __init__(self, base_dir="."):
+    def __init__(self, base_dir=".", repository=None, max_recordings=None, hub_sync=None, load_translations=None):
         self.base_dir = Path(base_dir)
         self.audio_dir = self.base_dir / "audio_recordings"
         self.metadata_file = self.base_dir / "metadata.json"
         self.backup_dir = self.base_dir / "backups"
         self.config_file = self.base_dir / "config.json"
         self.ADMIN_USERNAME = "sheickydollar"
-        self.HF_DATASET_REPO = f"{self.ADMIN_USERNAME}/quran-audio-moore"
+        self.HF_DATASET_REPO = repository or f"{self.ADMIN_USERNAME}/quran-audio-moore"
+        self.default_max_recordings = max_recordings or 5
+        
+        # Sérialise les lectures-modifications de metadata.json entre threads
+        self._metadata_lock = threading.RLock()
+        
+        # Fonctions appelées après chaque sauvegarde des métadonnées ou de la configuration
+        self.metadata_listeners = []
+        
+        # Nombre d'enregistrements approuvés par verset, recalculé à chaque sauvegarde des métadonnées
+        self._approved_counts = None
         
         # Créer les dossiers nécessaires
+        self.base_dir.mkdir(parents=True, exist_ok=True)
         self.audio_dir.mkdir(exist_ok=True)
         self.backup_dir.mkdir(exist_ok=True)
         
         # Initialiser ou charger la configuration
         self.init_config()
+        
+        # Le plafond fixé par le projet (catalogs.json) prime sur celui de config.json
+        if max_recordings is not None and self.config["max_recordings_per_verse"] != max_recordings:
+            self.config["max_recordings_per_verse"] = max_recordings
+            self.save_config()
+        
+        # File d'attente persistante des publications vers HuggingFace (partagée entre projets si fournie)
+        self.hub_sync = hub_sync or HubSync(
+            self.base_dir,
+            lambda repo_id: self.create_huggingface_dataset(),
+            token=os.getenv("HUGGINGFACE_TOKEN")
+        )
+        
+        # Dataset Arrow local mis à jour de façon incrémentale
+        self.dataset_cache = DatasetCache(self.base_dir / "dataset_cache", load_translations or self._load_verse_translations)
+        
+        # Index des durées et caractéristiques des fichiers audio
+        self.audio_index = AudioFeatureIndex(self.base_dir / "audio_features.parquet", self.audio_dir, self.base_dir)
+        
+        # Aperçus compressés pour la revue des enregistrements
+        self.previews = PreviewStore(self.base_dir / "previews")
+        
+        # Traitement en arrière-plan des enregistrements soumis
+        self.submissions = SubmissionPipeline(self, admission_settings=self.config.get("admission"))
+        
+        # Archivage à froid des enregistrements rejetés ou remplacés
+        self.lifecycle = StorageLifecycle(self, self.config.get("storage"))
+        
+        # Versets rejetés à réenregistrer, indexés par (utilisateur, verset)
+        self.rerecord_queue = RerecordQueue(self.base_dir / "rerecord_queue.json", self.config.get("rerecord"))
+        self._migrate_rerecord_lists()
 
     def init_config(self):
         """Initialiser ou charger la configuration du système."""
         if not self.config_file.exists():
             default_config = {
                 "admin_username": self.ADMIN_USERNAME,
-                "max_recordings_per_verse": 5,
+                "max_recordings_per_verse": self.default_max_recordings,
                 "repository": self.HF_DATASET_REPO,
                 "settings": {
                     "require_admin_approval": True,
                     "auto_sync_to_hub": True
-                }
+                },
+                "admission": DEFAULT_ADMISSION_SETTINGS,
+                "storage": DEFAULT_STORAGE_SETTINGS,
+                "rerecord": DEFAULT_RERECORD_SETTINGS
             }
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(default_config, f, ensure_ascii=False, indent=2)
+            self._write_json(self.config_file, default_config)
         
         with open(self.config_file, 'r', encoding='utf-8') as f:
             self.config = json.load(f)
@@ -59,10 +114,22 @@ class DataManager:
         self.config["max_recordings_per_verse"] = new_max
         self.save_config()
 
+    def _write_json(self, path, data):
+        """Écrire un fichier JSON de façon atomique: les lecteurs sans verrou ne voient jamais un fichier partiel."""
+        tmp_file = path.with_suffix(".tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, path)
+
     def save_config(self):
         """Sauvegarder la configuration."""
-        with open(self.config_file, 'w', encoding='utf-8') as f:
-            json.dump(self.config, f, ensure_ascii=False, indent=2)
+        self._write_json(self.config_file, self.config)
+        
+        # Le plafond par verset entre dans la couverture et les statistiques publiées
+        for listener in self.metadata_listeners:
+            listener()
 
     def load_metadata(self, username=None):
         """Charger les métadonnées depuis le fichier JSON."""
@@ -85,45 +152,193 @@ class DataManager:
         return {"recordings": [], "users": {}}
 
     def save_recording(self, audio_data, user_id, verse_info):
-        """Sauvegarder un nouvel enregistrement."""
-        metadata = self._load_full_metadata()
+        """Sauvegarder un nouvel enregistrement et attendre la fin de son traitement."""
+        job = self.submissions.store(audio_data, user_id, verse_info)
+        job = self.submissions.run(job["id"])
+        if job["status"] == "failed":
+            raise RuntimeError(job["error"])
+        return job["recording_id"]
+
+    def submit_recording(self, audio_data, user_id, verse_info):
+        """Accepter un enregistrement sans attendre son traitement; retourne le travail créé."""
+        return self.submissions.submit(audio_data, user_id, verse_info)
+
+    def index_recording(self, job):
+        """Ajouter l'enregistrement d'une soumission traitée aux métadonnées."""
+        with self._metadata_lock:
+            metadata = self._load_full_metadata()
+            
+            # Une soumission reprise après interruption peut déjà être indexée
+            if any(r["id"] == job["recording_id"] for r in metadata["recordings"]):
+                self.rerecord_queue.remove_recorded(job["user_id"], job["verse"]["id"])
+                return
+            
+            # Le plafond est revérifié ici: plusieurs soumissions du même verset peuvent être en cours
+            approved = sum(1 for r in metadata["recordings"] if r["verse_id"] == job["verse"]["id"] and r["status"] == "approved")
+            if approved >= self.get_max_recordings():
+                # L'audio converti n'est rattaché à aucun enregistrement
+                if os.path.exists(job["audio_path"]):
+                    os.remove(job["audio_path"])
+                raise ValueError("ce verset a déjà atteint le nombre maximum d'enregistrements")
+            
+            recording_info = {
+                "id": job["recording_id"],
+                "user_id": job["user_id"],
+                "verse_id": job["verse"]["id"],
+                "sura": job["verse"]["sura"],
+                "aya": job["verse"]["aya"],
+                "audio_path": job["audio_path"],
+                "gender": metadata["users"][job["user_id"]]["gender"],
+                "timestamp": job["timestamp"],
+                "status": "approved",  # Par défaut approuvé
+                "approved_by": None,
+                "approved_at": datetime.now().isoformat()
+            }
+            
+            metadata["recordings"].append(recording_info)
+            self.save_metadata(metadata)
         
-        # Créer le nom du fichier audio
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        audio_filename = f"{user_id}_sura{verse_info['sura']}_aya{verse_info['aya']}_{timestamp}.wav"
-        audio_path = self.audio_dir / audio_filename
-
-        # Sauvegarder l'audio
-        audio_data.save(str(audio_path))
-
-        # Créer l'ID unique de l'enregistrement
-        recording_id = f"rec_{timestamp}_{user_id}"
-
-        # Mettre à jour les métadonnées
-        recording_info = {
-            "id": recording_id,
-            "user_id": user_id,
-            "verse_id": str(verse_info['id']),
-            "sura": verse_info['sura'],
-            "aya": verse_info['aya'],
-            "audio_path": str(audio_path),
-            "gender": metadata["users"][user_id]["gender"],
-            "timestamp": datetime.now().isoformat(),
-            "status": "approved",  # Par défaut approuvé
-            "approved_by": None,
-            "approved_at": datetime.now().isoformat()
+        # Le verset rejeté de l'utilisateur est retiré de la file dès que son nouvel enregistrement est indexé,
+        # y compris s'il avait été réattribué à un autre contributeur
+        self.rerecord_queue.remove_recorded(job["user_id"], job["verse"]["id"])
+
+    def index_take(self, job, boundaries, clip_paths):
+        """Indexer les extraits d'une prise multi-versets; retourne (id, fichier) des extraits ajoutés."""
+        take_id = job["take_id"]
+        user_id = job["user_id"]
+        added = []
+        
+        with self._metadata_lock:
+            metadata = self._load_full_metadata()
+            takes = metadata.setdefault("takes", {})
+            
+            # Une prise reprise après interruption peut déjà être indexée
+            if take_id in takes:
+                indexed = self._take_recordings(metadata, take_id)
+                self._remove_orphan_clips(clip_paths, {r["audio_path"] for r in indexed.values()})
+                for recording in indexed.values():
+                    self.rerecord_queue.remove_recorded(user_id, recording["verse_id"])
+                return [(rid, r["audio_path"]) for rid, r in indexed.items()]
+            
+            recorded = {r["verse_id"] for r in metadata["recordings"] if r["user_id"] == user_id and is_active(r)}
+            approved_counts = self._count_approved(metadata)
+            max_recordings = self.get_max_recordings()
+            recording_ids = []
+            indexed_verses = []
+            for verse, (start, end), clip_path in zip(job["verses"], boundaries, clip_paths):
+                # Les versets déjà enregistrés par l'utilisateur ou complets ne sont pas indexés
+                if verse["id"] in recorded or approved_counts.get(verse["id"], 0) >= max_recordings:
+                    continue
+                
+                recording_id = f"{take_id}_aya{verse['aya']}"
+                metadata["recordings"].append({
+                    "id": recording_id,
+                    "user_id": user_id,
+                    "verse_id": verse["id"],
+                    "sura": verse["sura"],
+                    "aya": verse["aya"],
+                    "audio_path": clip_path,
+                    "gender": metadata["users"][user_id]["gender"],
+                    "timestamp": job["timestamp"],
+                    # Les bornes doivent être vérifiées par l'administrateur avant approbation
+                    "status": "pending",
+                    "approved_by": None,
+                    "approved_at": None,
+                    "segment": {"take_id": take_id, "start": round(start, 2), "end": round(end, 2)}
+                })
+                recording_ids.append(recording_id)
+                indexed_verses.append(verse["id"])
+                added.append((recording_id, clip_path))
+            
+            takes[take_id] = {
+                "user_id": user_id,
+                "audio_path": job["audio_path"],
+                "timestamp": job["timestamp"],
+                "verses": [v["id"] for v in job["verses"]],
+                "clip_paths": clip_paths,
+                "boundaries": [[round(start, 2), round(end, 2)] for start, end in boundaries],
+                "recording_ids": recording_ids
+            }
+            self.save_metadata(metadata)
+        
+        # Les extraits des versets écartés ne sont rattachés à aucun enregistrement
+        self._remove_orphan_clips(clip_paths, {clip_path for _, clip_path in added})
+        
+        # Les versets rejetés dont un extrait est indexé sont retirés de la file de réenregistrement
+        for verse_id in indexed_verses:
+            self.rerecord_queue.remove_recorded(user_id, verse_id)
+        return added
+
+    def _remove_orphan_clips(self, clip_paths, kept):
+        """Supprimer les extraits découpés qui ne sont pas indexés."""
+        for clip_path in clip_paths:
+            if clip_path not in kept and os.path.exists(clip_path):
+                os.remove(clip_path)
+
+    def _take_recordings(self, metadata, take_id):
+        return {
+            r["id"]: r for r in metadata["recordings"]
+            if r.get("segment", {}).get("take_id") == take_id
         }
+
+    def get_take(self, take_id, admin_username):
+        """Obtenir une prise multi-versets et ses bornes."""
+        if not self.is_admin(admin_username):
+            raise PermissionError("Seul l'administrateur peut consulter les prises")
         
-        metadata["recordings"].append(recording_info)
-        self.save_metadata(metadata)
+        take = self._load_full_metadata().get("takes", {}).get(take_id)
+        if take is None:
+            raise ValueError(f"Prise introuvable: {take_id}")
+        return take
+
+    def resegment_take(self, take_id, boundaries, admin_username):
+        """Appliquer les bornes corrigées par l'administrateur et redécouper les extraits."""
+        take = self.get_take(take_id, admin_username)
+        if len(boundaries) != len(take["verses"]):
+            raise ValueError(f"{len(take['verses'])} segments attendus, {len(boundaries)} fournis")
         
-        # Synchroniser immédiatement avec HuggingFace
-        try:
-            self.sync_to_huggingface()
-        except Exception as e:
-            print(f"Erreur lors de la synchronisation avec HuggingFace: {str(e)}")
+        # La prise a pu être archivée entre-temps
+        if not os.path.exists(take["audio_path"]):
+            self.lifecycle.restore_take(take_id)
+        validate_boundaries(boundaries, sf.info(take["audio_path"]).duration)
+        
+        with self._metadata_lock:
+            metadata = self._load_full_metadata()
+            by_path = dict(zip(take["clip_paths"], boundaries))
+            recordings = {}
+            for recording_id, recording in self._take_recordings(metadata, take_id).items():
+                bounds = by_path.get(recording["audio_path"])
+                if bounds is None:
+                    # Extrait sans correspondance dans la prise: écarté du dataset
+                    recording["status"] = "removed"
+                    recording["removed_at"] = datetime.now().isoformat()
+                    continue
+                recording["segment"].update({"start": bounds[0], "end": bounds[1]})
+                # Seuls les extraits encore en revue ou approuvés sont redécoupés
+                if is_active(recording) and "archive" not in recording:
+                    recordings[recording_id] = recording
+            
+            self.submissions.cut_clips(
+                take["audio_path"],
+                [by_path[r["audio_path"]] for r in recordings.values()],
+                [r["audio_path"] for r in recordings.values()]
+            )
+            metadata["takes"][take_id]["boundaries"] = [[start, end] for start, end in boundaries]
+            self.save_metadata(metadata)
         
-        return recording_id
+        for recording_id, recording in recordings.items():
+            try:
+                self.previews.generate(recording_id, recording["audio_path"])
+            except Exception as e:
+                print(f"Erreur lors de la génération de l'aperçu {recording_id}: {str(e)}")
+        # Durées des extraits redécoupés
+        self.audio_index.request_update()
+
+    def start_background_tasks(self):
+        """Reprendre les traitements interrompus et lancer les tâches périodiques (synchronisation, archivage)."""
+        self.submissions.recover()
+        self.hub_sync.start()
+        self.lifecycle.start()
 
     def save_metadata(self, metadata):
         """Sauvegarder les métadonnées avec backup."""
@@ -131,12 +346,35 @@ class DataManager:
             backup_path = self.backup_dir / f"metadata_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
             shutil.copy(self.metadata_file, backup_path)
 
-        with open(self.metadata_file, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        self._write_json(self.metadata_file, metadata)
+        self._approved_counts = self._count_approved(metadata)
+        
+        for listener in self.metadata_listeners:
+            listener()
+
+    def _count_approved(self, metadata):
+        counts = {}
+        for recording in metadata["recordings"]:
+            if recording["status"] == "approved":
+                counts[recording["verse_id"]] = counts.get(recording["verse_id"], 0) + 1
+        return counts
+
+    def approved_count(self, verse_id):
+        """Nombre d'enregistrements approuvés d'un verset (sans relire les métadonnées)."""
+        counts = self._approved_counts
+        if counts is None:
+            counts = self._approved_counts = self._count_approved(self._load_full_metadata())
+        return counts.get(str(verse_id), 0)
+
+    def is_verse_full(self, verse_id):
+        """Vrai si le verset a atteint le nombre maximum d'enregistrements approuvés."""
+        return self.approved_count(verse_id) >= self.get_max_recordings()
 
     def get_recording_stats(self, username=None):
         """Obtenir les statistiques des enregistrements."""
         metadata = self.load_metadata(username)
+        # Les enregistrements rejetés ou retirés ne sont pas comptés
+        metadata["recordings"] = [r for r in metadata["recordings"] if r["status"] not in INACTIVE_STATUSES]
         
         if not self.is_admin(username):
             # Pour les utilisateurs non-admin, montrer seulement leurs stats
@@ -168,19 +406,46 @@ class DataManager:
             
         return stats
 
+    def restore_recording(self, recording_id, admin_username):
+        """Restaurer depuis l'archive le fichier audio d'un enregistrement."""
+        if not self.is_admin(admin_username):
+            raise PermissionError("Seul l'administrateur peut restaurer les enregistrements")
+        
+        self.lifecycle.restore_recording(recording_id)
+
+    def prepare_preview(self, recording_id, admin_username):
+        """Générer l'aperçu d'un enregistrement s'il manque (enregistrements antérieurs aux aperçus)."""
+        if not self.is_admin(admin_username):
+            raise PermissionError("Seul l'administrateur peut écouter les enregistrements")
+        
+        if self.previews.has_preview(recording_id):
+            return
+        recording = next((r for r in self._load_full_metadata()["recordings"] if r["id"] == recording_id), None)
+        if recording is None:
+            raise ValueError(f"Enregistrement introuvable: {recording_id}")
+        self.previews.generate(recording_id, recording["audio_path"])
+
+    def run_storage_lifecycle(self, admin_username):
+        """Archiver les enregistrements rejetés ou remplacés et purger les archives expirées."""
+        if not self.is_admin(admin_username):
+            raise PermissionError("Seul l'administrateur peut lancer le nettoyage du stockage")
+        
+        return self.lifecycle.run()
+
     def approve_recording(self, recording_id, admin_username):
         """Approuver un enregistrement."""
         if not self.is_admin(admin_username):
             raise PermissionError("Seul l'administrateur peut approuver les enregistrements")
         
-        metadata = self._load_full_metadata()
-        for recording in metadata["recordings"]:
-            if recording["id"] == recording_id:
-                recording["status"] = "approved"
-                recording["approved_by"] = admin_username
-                recording["approved_at"] = datetime.now().isoformat()
-                break
-        self.save_metadata(metadata)
+        with self._metadata_lock:
+            metadata = self._load_full_metadata()
+            for recording in metadata["recordings"]:
+                if recording["id"] == recording_id:
+                    recording["status"] = "approved"
+                    recording["approved_by"] = admin_username
+                    recording["approved_at"] = datetime.now().isoformat()
+                    break
+            self.save_metadata(metadata)
         
         if self.config["settings"]["auto_sync_to_hub"]:
             self.sync_to_huggingface()
@@ -190,32 +455,26 @@ class DataManager:
         if not self.is_admin(admin_username):
             raise PermissionError("Seul l'administrateur peut rejeter les enregistrements")
         
-        metadata = self._load_full_metadata()
+        with self._metadata_lock:
+            metadata = self._load_full_metadata()
         
-        for recording in metadata["recordings"]:
-            if recording["id"] == recording_id:
-                # Marquer l'enregistrement comme rejeté
-                recording["status"] = "rejected"
-                recording["rejected_by"] = admin_username
-                recording["rejected_at"] = datetime.now().isoformat()
-                
-                # Ajouter le verset à la liste des versets à réenregistrer pour l'utilisateur
-                user_id = recording["user_id"]
-                verse_info = {
-                    "verse_id": recording["verse_id"],
-                    "sura": recording["sura"],
-                    "aya": recording["aya"]
-                }
+            for recording in metadata["recordings"]:
+                if recording["id"] == recording_id:
+                    # Marquer l'enregistrement comme rejeté
+                    recording["status"] = "rejected"
+                    recording["rejected_by"] = admin_username
+                    recording["rejected_at"] = datetime.now().isoformat()
                 
-                if "verses_to_rerecord" not in metadata:
-                    metadata["verses_to_rerecord"] = {}
-                if user_id not in metadata["verses_to_rerecord"]:
-                    metadata["verses_to_rerecord"][user_id] = []
+                    # Inscrire le verset dans la file de réenregistrement de l'utilisateur
+                    self.rerecord_queue.add(
+                        recording["user_id"],
+                        recording,
+                        rejected_at=recording["rejected_at"],
+                        recording_id=recording_id
+                    )
+                    break
                 
-                metadata["verses_to_rerecord"][user_id].append(verse_info)
-                break
-                
-        self.save_metadata(metadata)
+            self.save_metadata(metadata)
         
         # Synchroniser avec HuggingFace pour retirer l'enregistrement rejeté
         try:
@@ -224,50 +483,64 @@ class DataManager:
             print(f"Erreur lors de la synchronisation avec HuggingFace: {str(e)}")
 
     def get_verses_to_rerecord(self, user_id):
-        """Obtenir la liste des versets à réenregistrer pour un utilisateur."""
-        metadata = self._load_full_metadata()
-        if "verses_to_rerecord" not in metadata:
-            return []
-        
-        return metadata["verses_to_rerecord"].get(user_id, [])
+        """Obtenir les versets à réenregistrer pour un utilisateur, du plus ancien rejet au plus récent."""
+        return self.rerecord_queue.for_user(user_id)
 
     def remove_verse_from_rerecord_list(self, user_id, verse_id):
-        """Retirer un verset de la liste des versets à réenregistrer."""
-        metadata = self._load_full_metadata()
-        if "verses_to_rerecord" in metadata and user_id in metadata["verses_to_rerecord"]:
-            metadata["verses_to_rerecord"][user_id] = [
-                verse for verse in metadata["verses_to_rerecord"][user_id]
-                if verse["verse_id"] != verse_id
-            ]
+        """Retirer un verset de la file des versets à réenregistrer."""
+        self.rerecord_queue.remove(user_id, verse_id)
+
+    def _migrate_rerecord_lists(self):
+        """Reprendre les anciennes listes `verses_to_rerecord` des métadonnées dans la file."""
+        with self._metadata_lock:
+            metadata = self._load_full_metadata()
+            legacy = metadata.pop("verses_to_rerecord", None)
+            if legacy is None:
+                return
+            
+            rejected_at = {}
+            redone = set()
+            for recording in metadata["recordings"]:
+                key = (recording["user_id"], recording["verse_id"])
+                if recording["status"] == "rejected":
+                    rejected_at[key] = recording.get("rejected_at")
+                else:
+                    redone.add(key)
+            
+            # Les doublons sont fusionnés; les versets déjà réenregistrés sont ignorés
+            for user_id, verses in legacy.items():
+                for verse in verses:
+                    key = (user_id, verse["verse_id"])
+                    if key not in redone:
+                        self.rerecord_queue.add(user_id, verse, rejected_at=rejected_at.get(key))
             self.save_metadata(metadata)
 
-    def sync_to_huggingface(self):
-        """Synchroniser les données avec HuggingFace."""
+    def request_sync(self):
+        """Demander une publication vers HuggingFace, traitée en arrière-plan par la file."""
+        self.hub_sync.request_publish(self.HF_DATASET_REPO)
+
+    def sync_to_huggingface(self, force=False):
+        """Synchroniser les données avec HuggingFace.
+        
+        La publication est d'abord inscrite dans la file d'attente persistante;
+        en cas d'échec elle sera retentée automatiquement. `force` ignore le
+        délai d'attente entre deux tentatives (synchronisation manuelle).
+        """
         if not self.is_admin(self.ADMIN_USERNAME):
             raise PermissionError("Seul l'administrateur peut synchroniser avec HuggingFace")
         
         try:
-            # Créer le dataset avec tous les enregistrements non rejetés
-            dataset = self.create_huggingface_dataset()
-            
-            # Push vers HuggingFace
-            dataset.push_to_hub(
-                self.HF_DATASET_REPO,
-                private=False,
-                commit_message=f"Update dataset - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-            )
-            
-            print(f"Dataset mis à jour avec succès sur {self.HF_DATASET_REPO}")
-            return True
+            self.hub_sync.enqueue_publish(self.HF_DATASET_REPO)
+            if self.hub_sync.process(force=force):
+                return True
+            print("Publication en attente, nouvelle tentative automatique prévue")
+            return False
         except Exception as e:
             print(f"Erreur lors de la synchronisation avec HuggingFace: {str(e)}")
             return False
 
-    def create_huggingface_dataset(self):
-        """Créer un dataset pour HuggingFace avec tous les enregistrements non rejetés."""
-        metadata = self._load_full_metadata()
-        
-        # Charger les versets pour avoir accès au texte
+    def _load_verse_translations(self):
+        """Charger les traductions des versets, indexées par ID de verset."""
         s3_path = "s3://moore-collection/raw_data/quran/data.xlsx"
         storage_options = {
             "key": os.getenv("AWS_ACCESS_KEY_ID"),
@@ -276,48 +549,17 @@ class DataManager:
         }
         verses_df = pd.read_excel(s3_path, storage_options=storage_options)
         verses_df.columns = ['id', 'sura', 'aya', 'translation', 'footnotes'] if len(verses_df.columns) >= 5 else verses_df.columns
-        
-        data = {
-            "audio": [],           # Fichier audio
-            "verse_id": [],        # ID du verset
-            "sura": [],           # Numéro de la sourate
-            "aya": [],            # Numéro du verset
-            "translation": [],     # Texte du verset en moore
-            "user_id": [],        # ID de l'utilisateur
-            "gender": [],         # Genre de l'utilisateur
-            "username": [],       # Nom d'utilisateur
-            "recording_date": [], # Date d'enregistrement
-            "status": []          # Statut de l'enregistrement
-        }
-        
-        for recording in metadata["recordings"]:
-            # Inclure tous les enregistrements sauf ceux qui sont rejetés
-            if recording["status"] != "rejected" and os.path.exists(recording["audio_path"]):
-                # Récupérer les informations du verset
-                verse_row = verses_df[verses_df['id'] == int(recording["verse_id"])]
-                if not verse_row.empty:
-                    translation = verse_row.iloc[0]['translation']
-                else:
-                    translation = "Traduction non disponible"
+        verses_df['id'] = pd.to_numeric(verses_df['id'], errors='coerce')
+        verses_df = verses_df.dropna(subset=['id'])
+        return {str(int(verse_id)): translation for verse_id, translation in zip(verses_df['id'], verses_df['translation'])}
 
-                data["audio"].append(recording["audio_path"])
-                data["verse_id"].append(recording["verse_id"])
-                data["sura"].append(recording["sura"])
-                data["aya"].append(recording["aya"])
-                data["translation"].append(translation)
-                data["user_id"].append(recording["user_id"])
-                data["gender"].append(recording["gender"])
-                data["username"].append(metadata["users"][recording["user_id"]]["username"])
-                data["recording_date"].append(recording["timestamp"])
-                data["status"].append(recording["status"])
-        
-        # Créer le dataset
-        dataset = Dataset.from_dict(data)
-        
-        # Convertir la colonne audio en caractéristiques audio
-        dataset = dataset.cast_column("audio", Audio())
+    def create_huggingface_dataset(self):
+        """Créer un dataset pour HuggingFace avec tous les enregistrements non rejetés.
         
-        return dataset
+        Le dataset est lu depuis le cache Arrow local, mis à jour uniquement
+        avec les enregistrements ajoutés ou rejetés depuis la dernière fois.
+        """
+        return self.dataset_cache.update(self._load_full_metadata())
 
     def backup_data(self):
         """Créer une sauvegarde complète des données."""
@@ -341,7 +583,7 @@ class DataManager:
         issues = []
         
         for recording in metadata["recordings"]:
-            if not os.path.exists(recording["audio_path"]):
+            if not os.path.exists(recording["audio_path"]) and "archive" not in recording:
                 issues.append(f"Fichier audio manquant: {recording['audio_path']}")
             
             if recording["user_id"] not in metadata["users"]:
@@ -351,8 +593,3 @@ class DataManager:
                 issues.append(f"Approbateur invalide: {recording['approved_by']}")
         
         return issues 
-    
-
-# Initialiser le gestionnaire de données
-data_manager = DataManager()
-print("Dossiers initialisés avec succès !") 
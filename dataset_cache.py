@@ -0,0 +1,140 @@
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from datasets import Dataset, Audio, Features, Value, concatenate_datasets, load_from_disk
+from recording_status import is_active
+
+# Schéma du dataset publié
+FEATURES = Features({
+    "audio": Audio(),              # Fichier audio
+    "recording_id": Value("string"),  # ID de l'enregistrement
+    "verse_id": Value("string"),   # ID du verset
+    "sura": Value("int64"),        # Numéro de la sourate
+    "aya": Value("int64"),         # Numéro du verset
+    "translation": Value("string"),  # Texte du verset en moore
+    "user_id": Value("string"),    # ID de l'utilisateur
+    "gender": Value("string"),     # Genre de l'utilisateur
+    "username": Value("string"),   # Nom d'utilisateur
+    "recording_date": Value("string"),  # Date d'enregistrement
+    "status": Value("string")      # Statut de l'enregistrement
+})
+
+
+def _generate_rows(recordings, users, translations):
+    for recording in recordings:
+        yield {
+            "audio": recording["audio_path"],
+            "recording_id": recording["id"],
+            "verse_id": recording["verse_id"],
+            "sura": int(recording["sura"]),
+            "aya": int(recording["aya"]),
+            "translation": translations.get(str(recording["verse_id"]), "Traduction non disponible"),
+            "user_id": recording["user_id"],
+            "gender": recording["gender"],
+            "username": users[recording["user_id"]]["username"],
+            "recording_date": recording["timestamp"],
+            "status": recording["status"]
+        }
+
+
+class DatasetCache:
+    """Dataset Arrow local, projeté en mémoire, maintenu de façon incrémentale.
+
+    Les lignes sont produites par un générateur et écrites par lots sur disque,
+    si bien que la mémoire utilisée ne dépend pas de la taille du corpus. Le
+    fichier `manifest.json` associe chaque enregistrement présent à son statut:
+    une mise à jour n'ajoute que les nouveaux enregistrements et ne retire que
+    ceux qui ont été rejetés, supprimés ou modifiés.
+    """
+
+    def __init__(self, cache_dir, load_translations, batch_size=200):
+        self.cache_dir = Path(cache_dir)
+        self.manifest_file = self.cache_dir / "manifest.json"
+        self.load_translations = load_translations
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _load_manifest(self):
+        if self.manifest_file.exists():
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {"version": 0, "recordings": {}}
+
+    def _dataset_dir(self, version):
+        return self.cache_dir / f"v{version}"
+
+    def load(self):
+        """Charger le dataset en cache (None s'il n'a pas encore été construit)."""
+        manifest = self._load_manifest()
+        dataset_dir = self._dataset_dir(manifest["version"])
+        if manifest["version"] == 0 or not dataset_dir.exists():
+            return None
+        return load_from_disk(str(dataset_dir))
+
+    def _build(self, recordings, users, translations):
+        return Dataset.from_generator(
+            _generate_rows,
+            features=FEATURES,
+            gen_kwargs={"recordings": recordings, "users": users, "translations": translations},
+            cache_dir=str(self.cache_dir / "build"),
+            writer_batch_size=self.batch_size
+        )
+
+    def update(self, metadata):
+        """Mettre le cache à jour à partir des métadonnées et retourner le dataset."""
+        # Inclure tous les enregistrements sauf ceux qui sont rejetés ou retirés
+        wanted = {
+            r["id"]: r for r in metadata["recordings"]
+            if is_active(r) and os.path.exists(r["audio_path"])
+        }
+
+        with self._lock:
+            manifest = self._load_manifest()
+            dataset = self.load()
+            cached = manifest["recordings"] if dataset is not None else {}
+
+            to_drop = {rid for rid, status in cached.items() if rid not in wanted or wanted[rid]["status"] != status}
+            to_add = [r for rid, r in wanted.items() if rid not in cached or rid in to_drop]
+
+            if dataset is not None and not to_drop and not to_add:
+                return dataset
+
+            parts = []
+            if dataset is not None:
+                if to_drop:
+                    dataset = dataset.filter(
+                        lambda ids: [rid not in to_drop for rid in ids],
+                        input_columns="recording_id",
+                        batched=True,
+                        batch_size=self.batch_size
+                    )
+                parts.append(dataset)
+            if to_add or not parts:
+                # Les traductions ne sont chargées que s'il y a des lignes à ajouter
+                translations = self.load_translations() if to_add else {}
+                parts.append(self._build(to_add, metadata["users"], translations))
+
+            updated = concatenate_datasets(parts) if len(parts) > 1 else parts[0]
+
+            # Écrire une nouvelle version puis basculer le manifeste dessus
+            version = manifest["version"] + 1
+            updated.save_to_disk(str(self._dataset_dir(version)))
+            new_manifest = {
+                "version": version,
+                "recordings": {rid: r["status"] for rid, r in wanted.items()}
+            }
+            tmp_file = self.manifest_file.with_suffix(".tmp")
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(new_manifest, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.manifest_file)
+
+            # Nettoyer les anciennes versions et les fichiers intermédiaires
+            for old_dir in self.cache_dir.glob("v*"):
+                if old_dir.name != f"v{version}":
+                    shutil.rmtree(old_dir, ignore_errors=True)
+            shutil.rmtree(self.cache_dir / "build", ignore_errors=True)
+
+            return self.load()
@@ -0,0 +1,82 @@
+import hashlib
+import os
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+# Taille des blocs lus sur disque lors de l'envoi d'un fichier
+CHUNK_SIZE = 64 * 1024
+
+
+def make_etag(*parts):
+    """Construire un ETag fort à partir des éléments fournis."""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def not_modified(request: Request, etag):
+    """Vrai si le client possède déjà la version identifiée par `etag`."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+
+
+def _parse_range(range_header, size):
+    """Interpréter un en-tête `Range: bytes=début-fin` (une seule plage)."""
+    if not range_header or not range_header.startswith("bytes=") or "," in range_header:
+        return None
+    start, _, end = range_header[len("bytes="):].strip().partition("-")
+    if start:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    elif end:
+        start = max(0, size - int(end))
+        end = size - 1
+    else:
+        return None
+    if start > end or start >= size:
+        raise ValueError("Plage non satisfaisable")
+    return start, end
+
+
+def _iter_file(path, start, length):
+    """Lire `length` octets d'un fichier à partir de `start`, bloc par bloc."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def file_response(path, request: Request, media_type, max_age=86400):
+    """Servir un fichier avec ETag, Cache-Control et prise en charge des requêtes partielles.
+
+    Le contenu est envoyé par blocs: le fichier n'est jamais chargé en mémoire.
+    """
+    stat = os.stat(path)
+    etag = make_etag(path, stat.st_mtime, stat.st_size)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={max_age}",
+        "Accept-Ranges": "bytes"
+    }
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        byte_range = _parse_range(request.headers.get("range"), stat.st_size)
+    except ValueError:
+        headers["Content-Range"] = f"bytes */{stat.st_size}"
+        return Response(status_code=416, headers=headers)
+
+    if byte_range is None:
+        headers["Content-Length"] = str(stat.st_size)
+        return StreamingResponse(_iter_file(path, 0, stat.st_size), media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(_iter_file(path, start, end - start + 1), status_code=206, media_type=media_type, headers=headers)
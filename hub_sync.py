@@ -0,0 +1,397 @@
+import fcntl
+import json
+import math
+import os
+import random
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+import requests
+from huggingface_hub import HfApi, CommitOperationAdd, CommitOperationDelete, DatasetCard, DatasetCardData, hf_hub_download
+
+# Texte de la fiche créée lorsque le dépôt n'en a pas encore
+DEFAULT_CARD_TEXT = "# Enregistrements audio du Coran\n\nEnregistrements de versets collectés et validés par les contributeurs.\n"
+
+
+def backoff_delay(attempts, base_delay=5, max_delay=900):
+    """Délai avant la prochaine tentative: exponentiel avec gigue aléatoire."""
+    cap = min(max_delay, base_delay * (2 ** attempts))
+    return random.uniform(base_delay, max(base_delay, cap))
+
+
+class CircuitBreaker:
+    """Disjoncteur qui suspend les publications tant que le Hub est injoignable."""
+
+    def __init__(self, failure_threshold=3, reset_timeout=300):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.time() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        return self.state != "open"
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            self.opened_at = time.time()
+
+
+class FileLock:
+    """Verrou exclusif partagé entre processus (`flock`), réentrant dans un même thread.
+
+    Empêche l'application et le script `sync_huggingface.py` de modifier la
+    file ou de publier en même temps.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def acquire(self, blocking=True):
+        if not self._lock.acquire(blocking=blocking):
+            return False
+        if self._depth == 0:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                self._lock.release()
+                return False
+            self._fd = fd
+        self._depth += 1
+        return True
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class HubSync:
+    """File d'attente persistante des publications vers HuggingFace.
+
+    Chaque demande de publication est enregistrée dans `sync_outbox.json` avant
+    toute tentative. Le dataset est construit une seule fois par opération puis
+    découpé en fragments Parquet dans `sync_staging/`. Les fragments sont
+    pré-envoyés un par un (les fragments déjà envoyés sont mémorisés, ce qui
+    permet de reprendre après une coupure sans reconstruire le dataset), puis
+    publiés avec la fiche du dataset (README.md, schéma `dataset_info` à jour)
+    et la suppression des anciens fragments en un seul commit: les lecteurs du
+    Hub voient l'ancienne version ou la nouvelle, jamais un mélange.
+    """
+
+    def __init__(self, base_dir, build_dataset, token=None, endpoint=None, shard_size=500,
+                 failure_threshold=3, reset_timeout=300):
+        self.base_dir = Path(base_dir)
+        self.outbox_file = self.base_dir / "sync_outbox.json"
+        self.staging_dir = self.base_dir / "sync_staging"
+        self.build_dataset = build_dataset
+        self.shard_size = shard_size
+        # HF_ENDPOINT permet de pointer vers un faux Hub local pour les tests
+        self.endpoint = (endpoint or os.getenv("HF_ENDPOINT") or "https://huggingface.co").rstrip("/")
+        self.api = HfApi(endpoint=self.endpoint, token=token)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        # Verrous partagés avec les autres processus travaillant sur le même dossier
+        self._outbox_lock = FileLock(self.base_dir / "sync_outbox.lock")
+        self._process_lock = FileLock(self.base_dir / "sync_process.lock")
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._worker = None
+
+    def _load_outbox(self):
+        if self.outbox_file.exists():
+            with open(self.outbox_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {"pending": []}
+
+    def _save_outbox(self, outbox):
+        tmp_file = self.outbox_file.with_suffix(".tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(outbox, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self.outbox_file)
+
+    def _update_op(self, op_id, **changes):
+        """Modifier une opération de la file et la persister."""
+        with self._outbox_lock:
+            outbox = self._load_outbox()
+            for op in outbox["pending"]:
+                if op["id"] == op_id:
+                    op.update(changes)
+                    self._save_outbox(outbox)
+                    return dict(op)
+        return None
+
+    def _remove_op(self, op_id):
+        with self._outbox_lock:
+            outbox = self._load_outbox()
+            outbox["pending"] = [op for op in outbox["pending"] if op["id"] != op_id]
+            self._save_outbox(outbox)
+        shutil.rmtree(self.staging_dir / op_id, ignore_errors=True)
+
+    def enqueue_publish(self, repo_id):
+        """Ajouter une demande de publication (fusionnée avec celle déjà en attente)."""
+        with self._outbox_lock:
+            outbox = self._load_outbox()
+            for op in outbox["pending"]:
+                if op["repo_id"] == repo_id:
+                    # Le dataset déjà préparé ne contient pas les dernières modifications
+                    op["dirty"] = True
+                    op["requested_at"] = datetime.now().isoformat()
+                    self._save_outbox(outbox)
+                    return op["id"]
+
+            op = {
+                "id": uuid.uuid4().hex[:12],
+                "repo_id": repo_id,
+                "requested_at": datetime.now().isoformat(),
+                "attempts": 0,
+                "next_attempt_at": 0,
+                "last_error": None,
+                "dirty": False,
+                "shards": [],
+                "uploaded": []
+            }
+            outbox["pending"].append(op)
+            self._save_outbox(outbox)
+            return op["id"]
+
+    def request_publish(self, repo_id):
+        """Inscrire une publication et réveiller le planificateur sans attendre l'envoi.
+
+        Si le planificateur n'est pas lancé, la demande reste dans la file
+        persistante jusqu'au prochain traitement.
+        """
+        op_id = self.enqueue_publish(repo_id)
+        self._wake_event.set()
+        return op_id
+
+    def pending_count(self):
+        with self._outbox_lock:
+            return len(self._load_outbox()["pending"])
+
+    def is_busy(self):
+        """Vrai si une publication est en cours, dans ce processus ou dans un autre."""
+        if not self._process_lock.acquire(blocking=False):
+            return True
+        self._process_lock.release()
+        return False
+
+    def status(self):
+        """Résumé de l'état de la synchronisation pour l'administration."""
+        with self._outbox_lock:
+            pending = self._load_outbox()["pending"]
+        return {
+            "pending": len(pending),
+            "circuit": self.breaker.state,
+            "last_error": next((op["last_error"] for op in pending if op["last_error"]), None)
+        }
+
+    def is_hub_reachable(self):
+        """Sonde légère qui évite de reconstruire le dataset si le Hub est hors ligne."""
+        try:
+            response = requests.head(self.endpoint, timeout=5)
+            return response.status_code < 500
+        except requests.RequestException:
+            return False
+
+    def process(self, force=False):
+        """Traiter les publications en attente.
+
+        Retourne True si toutes les publications en attente ont été envoyées.
+        Une publication réussie dont le dépôt a été modifié pendant l'envoi
+        compte comme envoyée: elle reste simplement en file pour la version
+        suivante. Retourne False sans rien faire si une publication est déjà
+        en cours, dans ce processus ou dans un autre.
+        """
+        if not self._process_lock.acquire(blocking=False):
+            return False
+
+        try:
+            with self._outbox_lock:
+                pending = [dict(op) for op in self._load_outbox()["pending"]]
+
+            published = True
+            for op in pending:
+                if not force:
+                    if time.time() < op["next_attempt_at"]:
+                        published = False
+                        continue
+                    if not self.breaker.allow():
+                        print("Hub injoignable: publication différée (disjoncteur ouvert)")
+                        return False
+                if self.breaker.state != "closed" and not self.is_hub_reachable():
+                    self.breaker.record_failure()
+                    self._update_op(op["id"], next_attempt_at=time.time() + backoff_delay(op["attempts"]))
+                    print("Hub toujours injoignable: publication différée")
+                    return False
+
+                try:
+                    self._publish(op)
+                except Exception as e:
+                    published = False
+                    self.breaker.record_failure()
+                    attempts = op["attempts"] + 1
+                    self._update_op(
+                        op["id"],
+                        attempts=attempts,
+                        last_error=str(e),
+                        next_attempt_at=time.time() + backoff_delay(attempts)
+                    )
+                    print(f"Erreur lors de la publication vers {op['repo_id']} (tentative {attempts}): {str(e)}")
+                    continue
+
+                self.breaker.record_success()
+                current = self._update_op(op["id"]) or {}
+                if current.get("dirty"):
+                    # Des modifications sont arrivées pendant l'envoi: republier
+                    shutil.rmtree(self.staging_dir / op["id"], ignore_errors=True)
+                    self._update_op(op["id"], shards=[], uploaded=[], attempts=0,
+                                    last_error=None, next_attempt_at=0)
+                    self._wake_event.set()
+                else:
+                    self._remove_op(op["id"])
+                print(f"Dataset mis à jour avec succès sur {op['repo_id']}")
+
+            return published
+        finally:
+            self._process_lock.release()
+
+    def _publish(self, op):
+        staging = self.staging_dir / op["id"]
+        if not op["shards"] or not staging.exists():
+            op = self._update_op(op["id"], dirty=False, uploaded=[])
+            shutil.rmtree(staging, ignore_errors=True)
+            staging.mkdir(parents=True)
+            dataset = self.build_dataset(op["repo_id"])
+            shards = self._write_shards(dataset, staging)
+            self._write_card(op["repo_id"], dataset, staging, shards)
+            op = self._update_op(op["id"], shards=shards)
+
+        repo_id = op["repo_id"]
+        self.api.create_repo(repo_id, repo_type="dataset", private=False, exist_ok=True)
+
+        # Pré-envoi fragment par fragment: une coupure ne fait perdre que le fragment en cours.
+        # Les fragments déjà pré-envoyés sont reconnus par le Hub et ne sont pas renvoyés au commit.
+        additions = []
+        for name in op["shards"]:
+            addition = CommitOperationAdd(path_in_repo=f"data/{name}", path_or_fileobj=str(staging / name))
+            if name not in op["uploaded"]:
+                self.api.preupload_lfs_files(repo_id, additions=[addition], repo_type="dataset")
+                op = self._update_op(op["id"], uploaded=op["uploaded"] + [name])
+            additions.append(addition)
+
+        # La fiche décrit le schéma des fragments publiés dans le même commit
+        if (staging / "README.md").exists():
+            additions.append(CommitOperationAdd(path_in_repo="README.md", path_or_fileobj=str(staging / "README.md")))
+
+        # Nouveaux fragments et suppression des fragments d'une publication précédente en un seul commit
+        stale = [
+            f for f in self.api.list_repo_files(repo_id, repo_type="dataset")
+            if f.startswith("data/") and f[len("data/"):] not in op["shards"]
+        ]
+        self.api.create_commit(
+            repo_id,
+            repo_type="dataset",
+            operations=additions + [CommitOperationDelete(path_in_repo=f) for f in stale],
+            commit_message=f"Update dataset - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ({len(op['shards'])} fragments)"
+        )
+
+    def _write_shards(self, dataset, staging):
+        """Découper le dataset en fragments Parquet contenant les octets audio."""
+        from datasets.table import embed_table_storage
+
+        num_shards = max(1, math.ceil(len(dataset) / self.shard_size))
+        names = []
+        for index in range(num_shards):
+            shard = dataset.shard(num_shards=num_shards, index=index, contiguous=True)
+            shard = shard.with_format("arrow").map(embed_table_storage, batched=True).with_format(None)
+            name = f"train-{index:05d}-of-{num_shards:05d}.parquet"
+            shard.to_parquet(str(staging / name))
+            names.append(name)
+        return names
+
+    def _write_card(self, repo_id, dataset, staging, shards):
+        """Écrire la fiche du dataset avec son schéma, ses splits et son nombre d'exemples.
+
+        Le texte de la fiche existante sur le Hub est conservé; seules ses
+        métadonnées (`dataset_info`, `configs`) sont régénérées.
+        """
+        from datasets.info import DatasetInfo, DatasetInfosDict
+        from datasets.splits import SplitDict, SplitInfo
+
+        try:
+            card = DatasetCard.load(hf_hub_download(
+                repo_id, "README.md", repo_type="dataset", token=self.api.token, endpoint=self.endpoint
+            ))
+        except Exception:
+            card = DatasetCard(DEFAULT_CARD_TEXT)
+
+        download_size = sum((staging / name).stat().st_size for name in shards)
+        dataset_size = dataset.data.nbytes
+        splits = SplitDict()
+        splits.add(SplitInfo(name="train", num_bytes=dataset_size, num_examples=len(dataset)))
+        info = DatasetInfo(features=dataset.features, splits=splits,
+                           download_size=download_size, dataset_size=dataset_size)
+
+        card_data = DatasetCardData(**{
+            key: value for key, value in card.data.to_dict().items()
+            if key not in ("dataset_info", "configs")
+        })
+        card_data["configs"] = [{"config_name": "default", "data_files": [{"split": "train", "path": "data/train-*"}]}]
+        DatasetInfosDict({"default": info}).to_dataset_card_data(card_data)
+        card.data = card_data
+        card.save(str(staging / "README.md"))
+
+    def start(self, interval=60):
+        """Lancer le rattrapage automatique des publications en arrière-plan."""
+        if self._worker and self._worker.is_alive():
+            return
+
+        def run():
+            while not self._stop_event.is_set():
+                # Réveil sur demande de publication, sinon rattrapage périodique
+                self._wake_event.wait(interval)
+                self._wake_event.clear()
+                if self._stop_event.is_set():
+                    return
+                try:
+                    if self.pending_count():
+                        self.process()
+                except Exception as e:
+                    print(f"Erreur lors du rattrapage de la synchronisation: {str(e)}")
+
+        self._worker = threading.Thread(target=run, name="hub-sync", daemon=True)
+        self._worker.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake_event.set()
@@ -1,5 +1,7 @@
-from data_manager import DataManager
+from catalogs import CatalogRegistry
 
-# Initialiser le gestionnaire de données
-data_manager = DataManager()
-print("Dossiers initialisés avec succès !") 
\ No newline at end of file
+# Initialiser les dossiers de données de chaque projet
+registry = CatalogRegistry()
+for name in registry.names():
+    registry.get(name).data_manager
+print("Dossiers initialisés avec succès !") 
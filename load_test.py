@@ -0,0 +1,402 @@
+"""Test de charge des handlers Gradio avec des contributeurs simulés.
+
+Le test s'exécute dans un dossier temporaire: huggingface.co est remplacé par
+un serveur HTTP local et la publication sur le Hub par une API factice. Les
+résultats (latences p50/p95/p99, débit, taux d'erreur, incohérences des
+métadonnées) sont affichés et peuvent être enregistrés en JSON pour comparer
+deux versions:
+
+    python load_test.py --users 20 --submissions 10 --output run.json
+    python load_test.py --users 20 --submissions 10 --compare run.json
+"""
+import argparse
+import importlib
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import numpy as np
+import soundfile as sf
+
+REPO_DIR = Path(__file__).resolve().parent
+VERSES_FILE = "moore_rwwad_v1.0.1-excel.1.xlsx"
+
+
+class StubHubHandler(BaseHTTPRequestHandler):
+    """Répond 200 à toutes les requêtes (profils utilisateurs et sonde du Hub)."""
+
+    def _reply(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(b"ok")
+
+    do_GET = do_HEAD = do_POST = do_PUT = _reply
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubHubApi:
+    """Remplace HfApi: mémorise les fichiers publiés avec une latence configurable.
+
+    Les `failures` premiers appels échouent, ce qui fait passer la publication
+    par les nouvelles tentatives, le disjoncteur et la reprise depuis la file.
+    Après chaque commit, le dépôt ne doit contenir qu'une seule version du
+    dataset (fragments `-of-N` cohérents).
+    """
+
+    def __init__(self, latency=0.05, failures=0):
+        self.latency = latency
+        self.failures = failures
+        self.failed_calls = 0
+        self.files = set()
+        self.uploads = 0
+        self.commits = 0
+        self.mixed_versions = 0
+        self._lock = threading.Lock()
+
+    def _call(self):
+        time.sleep(self.latency)
+        with self._lock:
+            if self.failed_calls < self.failures:
+                self.failed_calls += 1
+                raise ConnectionError("Hub factice indisponible")
+
+    def create_repo(self, repo_id, **kwargs):
+        self._call()
+
+    def preupload_lfs_files(self, repo_id, additions, **kwargs):
+        self._call()
+        with self._lock:
+            self.uploads += len(additions)
+
+    def list_repo_files(self, repo_id, **kwargs):
+        with self._lock:
+            return sorted(self.files)
+
+    def create_commit(self, repo_id, operations, **kwargs):
+        self._call()
+        with self._lock:
+            for operation in operations:
+                if hasattr(operation, "path_or_fileobj"):
+                    self.files.add(operation.path_in_repo)
+                else:
+                    self.files.discard(operation.path_in_repo)
+            self.commits += 1
+            versions = {f.rsplit("-of-", 1)[-1] for f in self.files if f.startswith("data/")}
+            if len(versions) > 1:
+                self.mixed_versions += 1
+
+
+def generate_audio(path, seconds, sample_rate=16000, seed=0):
+    """Générer un faux enregistrement: voyelles synthétiques séparées de silences."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    envelope = (np.sin(2 * np.pi * 1.5 * t) > -0.3).astype(np.float32)
+    signal = 0.3 * np.sin(2 * np.pi * rng.uniform(120, 250) * t) * envelope
+    signal += 0.005 * rng.standard_normal(len(t))
+    sf.write(str(path), signal.astype(np.float32), sample_rate)
+
+
+class Recorder:
+    """Collecte des latences et des erreurs par handler."""
+
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def call(self, name, fn, *args, is_error=None):
+        start = time.perf_counter()
+        try:
+            result = fn(*args)
+            failed = bool(is_error and is_error(result))
+        except Exception as e:
+            result, failed = e, True
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.samples.setdefault(name, []).append(elapsed)
+            if failed:
+                self.errors[name] = self.errors.get(name, 0) + 1
+        return result
+
+    def summary(self, duration):
+        report = {}
+        for name, samples in sorted(self.samples.items()):
+            latencies = np.array(samples) * 1000
+            report[name] = {
+                "count": len(samples),
+                "p50_ms": float(np.percentile(latencies, 50)),
+                "p95_ms": float(np.percentile(latencies, 95)),
+                "p99_ms": float(np.percentile(latencies, 99)),
+                "throughput_per_s": len(samples) / duration,
+                "error_rate": self.errors.get(name, 0) / len(samples)
+            }
+        return report
+
+
+def _status_is_error(result):
+    """Vrai pour une erreur ou un refus d'admission (file pleine, débit limité, disque plein)."""
+    message = result[0] if isinstance(result, tuple) else result
+    if not isinstance(message, str):
+        return False
+    message = message.lower()
+    return "erreur" in message or "non autorisé" in message or "serveur très sollicité" in message
+
+
+def check_consistency(data_manager, acknowledged):
+    """Comparer les métadonnées finales aux soumissions confirmées."""
+    metadata = data_manager._load_full_metadata()
+    recording_ids = {r["id"] for r in metadata["recordings"]}
+    max_recordings = data_manager.get_max_recordings()
+
+    approved = {}
+    pairs = {}
+    for recording in metadata["recordings"]:
+        if recording["status"] == "approved":
+            approved[recording["verse_id"]] = approved.get(recording["verse_id"], 0) + 1
+        # Un enregistrement rejeté puis refait n'est pas un doublon
+        if recording["status"] != "rejected":
+            key = (recording["user_id"], recording["verse_id"])
+            pairs[key] = pairs.get(key, 0) + 1
+
+    failed_jobs = [
+        job_id for job_id in acknowledged
+        if (data_manager.submissions.get_job(job_id) or {}).get("status") == "failed"
+    ]
+    return {
+        "acknowledged_submissions": len(acknowledged),
+        "indexed_recordings": len(recording_ids),
+        "lost_recordings": sorted(set(acknowledged) - recording_ids - set(failed_jobs)),
+        "failed_jobs": failed_jobs,
+        "verses_over_cap": {v: c for v, c in approved.items() if c > max_recordings},
+        "duplicate_user_verse": [f"{u}:{v}" for (u, v), c in pairs.items() if c > 1],
+        "missing_audio_files": [r["id"] for r in metadata["recordings"] if not os.path.exists(r["audio_path"])]
+    }
+
+
+def wait_for_submissions(data_manager, job_ids, timeout):
+    """Attendre la fin du traitement en arrière-plan des soumissions."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        statuses = [(data_manager.submissions.get_job(job_id) or {}).get("status") for job_id in job_ids]
+        if all(status in ("done", "failed") for status in statuses):
+            return True
+        time.sleep(0.2)
+    return False
+
+
+def drain_hub(hub_sync, timeout):
+    """Forcer les publications restées en file jusqu'à ce qu'elle soit vide."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if hub_sync.process(force=True) and hub_sync.pending_count() == 0:
+            return True
+        time.sleep(0.2)
+    return False
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "describe", "--always", "--dirty"], cwd=REPO_DIR, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except Exception:
+        return "inconnue"
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    workdir = Path(tempfile.mkdtemp(prefix="load_test_"))
+    shutil.copy(REPO_DIR / VERSES_FILE, workdir / VERSES_FILE)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["HF_ENDPOINT"] = f"http://127.0.0.1:{server.server_address[1]}"
+
+    # L'application crée ses dossiers et fichiers dans le dossier courant
+    os.chdir(workdir)
+    sys.path.insert(0, str(REPO_DIR))
+    app_module = importlib.import_module("app")
+    data_manager = app_module.catalogs.get().data_manager
+    data_manager.hub_sync.api = StubHubApi(latency=args.hub_latency, failures=args.hub_failures)
+    # Publications en arrière-plan pendant la charge, comme en production
+    data_manager.hub_sync.start(interval=1)
+
+    # Les handlers d'administration sont définis dans create_interface
+    interface = app_module.create_interface()
+    fns = interface.fns.values() if isinstance(interface.fns, dict) else interface.fns
+    handlers = {f.fn.__name__: f.fn for f in fns if f.fn is not None}
+    approve_recording = handlers["approve_recording"]
+    display_admin_stats = handlers["display_admin_stats"]
+
+    audio_files = []
+    for index in range(args.audio_variants):
+        path = workdir / f"generated_{index}.wav"
+        generate_audio(path, rng.uniform(2, 8), seed=args.seed + index)
+        audio_files.append(str(path))
+
+    recorder = Recorder()
+    acknowledged = []
+    acknowledged_lock = threading.Lock()
+    stop_admin = threading.Event()
+
+    def contributor(index):
+        # Un générateur par contributeur: les threads ne se disputent pas la même séquence
+        rng = random.Random(args.seed + index)
+        username = f"loaduser{index}"
+        result = recorder.call(
+            "register_user", app_module.register_user, username, rng.choice(["Homme", "Femme"]),
+            is_error=lambda r: r[4] is None
+        )
+        session = result[4] if isinstance(result, tuple) else None
+        if session is None:
+            return
+
+        for _ in range(args.submissions):
+            if rng.random() < args.skip_ratio:
+                _, session = recorder.call("get_next_verse", app_module.get_next_verse, session)
+            jobs_before = len(session["jobs"])
+            status, _, session = recorder.call(
+                "submit_recording", app_module.submit_recording, rng.choice(audio_files), session,
+                is_error=_status_is_error
+            )
+            if len(session["jobs"]) > jobs_before:
+                with acknowledged_lock:
+                    acknowledged.append(session["jobs"][-1]["id"])
+            time.sleep(rng.uniform(0, args.think_time))
+
+    def admin():
+        rng = random.Random(args.seed + args.users)
+        admin_name = data_manager.ADMIN_USERNAME
+        while not stop_admin.is_set():
+            with acknowledged_lock:
+                candidates = list(acknowledged)
+            if candidates:
+                recorder.call(
+                    "approve_recording", approve_recording, admin_name, rng.choice(candidates),
+                    is_error=lambda r: "succès" not in r
+                )
+            recorder.call("display_admin_stats", display_admin_stats, admin_name, is_error=_status_is_error)
+            stop_admin.wait(args.admin_interval)
+
+    start = time.perf_counter()
+    admin_thread = threading.Thread(target=admin, daemon=True)
+    admin_thread.start()
+    with ThreadPoolExecutor(max_workers=args.users) as executor:
+        list(executor.map(contributor, range(args.users)))
+    duration = time.perf_counter() - start
+    stop_admin.set()
+    admin_thread.join()
+
+    drained = wait_for_submissions(data_manager, acknowledged, args.drain_timeout)
+    data_manager.hub_sync.stop()
+    hub_drained = drain_hub(data_manager.hub_sync, args.drain_timeout)
+    total = sum(len(s) for s in recorder.samples.values())
+
+    report = {
+        "revision": git_revision(),
+        "parameters": vars(args),
+        "duration_s": duration,
+        "total_throughput_per_s": total / duration if duration else 0.0,
+        "handlers": recorder.summary(duration),
+        "drained": drained,
+        "consistency": check_consistency(data_manager, acknowledged),
+        "hub": {
+            "drained": hub_drained,
+            "pending": data_manager.hub_sync.pending_count(),
+            "circuit": data_manager.hub_sync.breaker.state,
+            "injected_failures": data_manager.hub_sync.api.failed_calls,
+            "uploads": data_manager.hub_sync.api.uploads,
+            "commits": data_manager.hub_sync.api.commits,
+            "mixed_versions": data_manager.hub_sync.api.mixed_versions
+        },
+        "admission": data_manager.submissions.admission.status()
+    }
+    server.shutdown()
+    if not args.keep:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+def print_report(report, previous=None):
+    print(f"\nRévision: {report['revision']} — durée {report['duration_s']:.1f} s, "
+          f"débit total {report['total_throughput_per_s']:.1f} appels/s")
+    print(f"{'Handler':<22}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'débit/s':>10}{'erreurs':>9}")
+    for name, stats in report["handlers"].items():
+        line = (f"{name:<22}{stats['count']:>6}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}"
+                f"{stats['p99_ms']:>10.1f}{stats['throughput_per_s']:>10.2f}{stats['error_rate']:>9.1%}")
+        before = (previous or {}).get("handlers", {}).get(name)
+        if before:
+            line += f"   (p95 {stats['p95_ms'] - before['p95_ms']:+.1f} ms vs {previous['revision']})"
+        print(line)
+
+    admission = report.get("admission")
+    if admission:
+        print(f"\nAdmission: {admission['admitted']} acceptées, "
+              f"{admission['rejected_queue_full']} refusées (file pleine), "
+              f"{admission['rejected_rate_limited']} refusées (débit), "
+              f"{admission['rejected_disk_full']} refusées (disque)")
+
+    hub = report.get("hub")
+    if hub:
+        print(f"\nHub: {hub['commits']} commit(s), {hub['uploads']} fragment(s) envoyé(s), "
+              f"{hub['injected_failures']} échec(s) simulé(s), file {'vidée' if hub['drained'] else 'NON vidée'} "
+              f"({hub['pending']} en attente, disjoncteur {hub['circuit']})")
+        if hub["mixed_versions"]:
+            print(f"  ⚠️ mixed_versions: {hub['mixed_versions']} commit(s) laissant plusieurs versions du dataset")
+
+    consistency = report["consistency"]
+    print(f"\nSoumissions confirmées: {consistency['acknowledged_submissions']}, "
+          f"enregistrements indexés: {consistency['indexed_recordings']}, "
+          f"traitement terminé: {'oui' if report['drained'] else 'NON'}")
+    for key in ("lost_recordings", "failed_jobs", "verses_over_cap", "duplicate_user_verse", "missing_audio_files"):
+        if consistency[key]:
+            print(f"  ⚠️ {key}: {len(consistency[key])} — {list(consistency[key])[:10]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge des handlers de l'application")
+    parser.add_argument("--users", type=int, default=10, help="Nombre de contributeurs simultanés")
+    parser.add_argument("--submissions", type=int, default=5, help="Enregistrements soumis par contributeur")
+    parser.add_argument("--skip-ratio", type=float, default=0.2, help="Probabilité de passer au verset suivant")
+    parser.add_argument("--think-time", type=float, default=0.2, help="Pause maximale entre deux actions (s)")
+    parser.add_argument("--admin-interval", type=float, default=0.5, help="Intervalle entre deux actions admin (s)")
+    parser.add_argument("--hub-latency", type=float, default=0.05, help="Latence simulée du Hub (s)")
+    parser.add_argument("--hub-failures", type=int, default=3, help="Appels au Hub en échec au début du test")
+    parser.add_argument("--audio-variants", type=int, default=4, help="Nombre de fichiers audio générés")
+    parser.add_argument("--drain-timeout", type=float, default=120, help="Attente maximale du traitement (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Enregistrer le rapport JSON dans ce fichier")
+    parser.add_argument("--compare", help="Rapport JSON d'une exécution précédente")
+    parser.add_argument("--keep", action="store_true", help="Conserver le dossier de travail temporaire")
+    args = parser.parse_args()
+
+    previous = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+    output = Path(args.output).resolve() if args.output else None
+
+    report = run(args)
+    print_report(report, previous)
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nRapport enregistré dans {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import hashlib
+import hmac
+import os
+import secrets
+import time
+from pathlib import Path
+from urllib.parse import quote
+import numpy as np
+import soundfile as sf
+from fastapi import APIRouter, HTTPException, Request
+from http_cache import file_response
+from recording_status import is_active
+
+# Paramètres des aperçus compressés
+PREVIEW_SAMPLE_RATE = 16000
+WAVEFORM_BARS = 160
+WAVEFORM_WIDTH = 480
+WAVEFORM_HEIGHT = 64
+
+# Durée de validité des liens signés vers les aperçus et les originaux (en secondes)
+SIGNED_URL_TTL = 3600
+# Clé de signature des liens; une clé aléatoire est tirée au démarrage si elle n'est pas fournie
+_URL_SECRET = (os.getenv("PREVIEW_URL_SECRET") or secrets.token_hex(32)).encode("utf-8")
+
+
+def _signature(path, expires):
+    return hmac.new(_URL_SECRET, f"{path}|{expires}".encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def sign_url(path, ttl=SIGNED_URL_TTL):
+    """Lien signé vers un aperçu ou un original, à ne produire que pour un administrateur.
+
+    L'expiration est arrondie à la période suivante pour que le lien reste le
+    même pendant une période (le cache du navigateur reste utilisable).
+    """
+    expires = (int(time.time()) // ttl + 2) * ttl
+    # La signature porte sur le chemin décodé, tel que le serveur le reçoit
+    return f"{quote(path)}?expires={expires}&signature={_signature(path, expires)}"
+
+
+def check_signature(request):
+    """Vérifier la signature et l'expiration d'un lien produit par `sign_url`."""
+    try:
+        expires = int(request.query_params.get("expires", ""))
+    except ValueError:
+        raise HTTPException(status_code=403, detail="Lien non signé")
+    signature = request.query_params.get("signature", "")
+    if expires < time.time() or not hmac.compare_digest(signature, _signature(request.url.path, expires)):
+        raise HTTPException(status_code=403, detail="Lien invalide ou expiré")
+
+
+def _resample(samples, sample_rate, target_rate):
+    """Rééchantillonnage linéaire (suffisant pour une écoute de contrôle)."""
+    if sample_rate == target_rate or len(samples) == 0:
+        return samples
+    duration = len(samples) / sample_rate
+    target_times = np.arange(int(duration * target_rate)) / target_rate
+    source_times = np.arange(len(samples)) / sample_rate
+    return np.interp(target_times, source_times, samples).astype(np.float32)
+
+
+def _waveform_svg(samples):
+    """Miniature SVG de la forme d'onde (pics par tranche)."""
+    if len(samples) == 0:
+        peaks = np.zeros(WAVEFORM_BARS)
+    else:
+        chunks = np.array_split(np.abs(samples), WAVEFORM_BARS)
+        peaks = np.array([chunk.max() if len(chunk) else 0.0 for chunk in chunks])
+        peaks = peaks / max(peaks.max(), 1e-6)
+
+    bar_width = WAVEFORM_WIDTH / WAVEFORM_BARS
+    middle = WAVEFORM_HEIGHT / 2
+    bars = "".join(
+        f'<rect x="{i * bar_width:.1f}" y="{middle - peak * middle:.1f}" '
+        f'width="{bar_width * 0.7:.1f}" height="{max(peak * WAVEFORM_HEIGHT, 1):.1f}"/>'
+        for i, peak in enumerate(peaks)
+    )
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{WAVEFORM_WIDTH}" height="{WAVEFORM_HEIGHT}" '
+        f'viewBox="0 0 {WAVEFORM_WIDTH} {WAVEFORM_HEIGHT}"><g fill="#4f46e5">{bars}</g></svg>'
+    )
+
+
+class PreviewStore:
+    """Aperçus audio compressés (Ogg Vorbis mono 16 kHz) et miniatures de forme d'onde."""
+
+    def __init__(self, preview_dir):
+        self.preview_dir = Path(preview_dir)
+        self.preview_dir.mkdir(exist_ok=True)
+
+    def audio_path(self, recording_id):
+        return self.preview_dir / f"{recording_id}.ogg"
+
+    def waveform_path(self, recording_id):
+        return self.preview_dir / f"{recording_id}.svg"
+
+    def has_preview(self, recording_id):
+        return self.audio_path(recording_id).exists() and self.waveform_path(recording_id).exists()
+
+    def generate(self, recording_id, audio_path):
+        """Générer l'aperçu et la miniature d'un enregistrement."""
+        data, sample_rate = sf.read(audio_path, dtype="float32", always_2d=True)
+        samples = _resample(data.mean(axis=1), sample_rate, PREVIEW_SAMPLE_RATE)
+
+        tmp_audio = self.preview_dir / f"{recording_id}.tmp.ogg"
+        sf.write(str(tmp_audio), samples, PREVIEW_SAMPLE_RATE, format="OGG", subtype="VORBIS")
+        tmp_audio.replace(self.audio_path(recording_id))
+
+        tmp_svg = self.preview_dir / f"{recording_id}.tmp.svg"
+        tmp_svg.write_text(_waveform_svg(samples), encoding="utf-8")
+        tmp_svg.replace(self.waveform_path(recording_id))
+
+    def remove(self, recording_id):
+        for path in (self.audio_path(recording_id), self.waveform_path(recording_id)):
+            if path.exists():
+                path.unlink()
+
+
+def create_preview_router(data_manager):
+    """Routes HTTP servant les aperçus, les miniatures et les fichiers originaux.
+
+    Les liens sont signés par l'interface d'administration (`sign_url`); les
+    aperçus manquants y sont générés, jamais lors d'une requête HTTP.
+    """
+    router = APIRouter()
+    previews = data_manager.previews
+
+    def check_request(recording_id, request):
+        if Path(recording_id).name != recording_id or recording_id.startswith("."):
+            raise HTTPException(status_code=400, detail="Identifiant invalide")
+        check_signature(request)
+
+    def find_recording(recording_id):
+        for recording in data_manager._load_full_metadata()["recordings"]:
+            if recording["id"] == recording_id:
+                return recording
+        raise HTTPException(status_code=404, detail="Enregistrement introuvable")
+
+    def preview_file(path):
+        if not path.exists():
+            raise HTTPException(status_code=404, detail="Aperçu non généré")
+        return path
+
+    @router.get("/previews/{recording_id}.ogg")
+    def preview_audio(recording_id: str, request: Request):
+        check_request(recording_id, request)
+        return file_response(preview_file(previews.audio_path(recording_id)), request, "audio/ogg")
+
+    @router.get("/previews/{recording_id}.svg")
+    def preview_waveform(recording_id: str, request: Request):
+        check_request(recording_id, request)
+        return file_response(preview_file(previews.waveform_path(recording_id)), request, "image/svg+xml")
+
+    @router.get("/recordings/{recording_id}/original")
+    def original_audio(recording_id: str, request: Request):
+        check_request(recording_id, request)
+        recording = find_recording(recording_id)
+        if not is_active(recording) or "archive" in recording:
+            raise HTTPException(status_code=403, detail="Enregistrement rejeté, retiré ou archivé")
+        if not Path(recording["audio_path"]).exists():
+            raise HTTPException(status_code=404, detail="Fichier audio manquant")
+        return file_response(recording["audio_path"], request, "audio/wav")
+
+    return router
@@ -0,0 +1,8 @@
+# Statuts d'enregistrement exclus du dataset, de la couverture et des statistiques:
+# rejeté par l'administrateur, ou retiré lors du redécoupage d'une prise
+INACTIVE_STATUSES = frozenset({"rejected", "removed"})
+
+
+def is_active(recording):
+    """Vrai si l'enregistrement compte (en attente ou approuvé)."""
+    return recording["status"] not in INACTIVE_STATUSES
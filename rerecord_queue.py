@@ -0,0 +1,185 @@
+import bisect
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+# Valeurs par défaut, remplaçables dans config.json (section "rerecord")
+DEFAULT_RERECORD_SETTINGS = {
+    "reassign_after_hours": 72      # Délai avant de proposer un verset rejeté à un autre contributeur (0: jamais)
+}
+
+
+class RerecordQueue:
+    """File des versets rejetés à réenregistrer.
+
+    Les entrées sont indexées par (utilisateur, verset), par verset et par date
+    d'attribution: un même rejet n'est inscrit qu'une fois et le retrait d'une
+    entrée ne touche pas aux métadonnées. Les versets sont proposés du plus
+    ancien rejet au plus récent. Passé `reassign_after_hours`, un verset non
+    réenregistré peut être confié à un autre contributeur; l'entrée sort de la
+    file dès que l'un ou l'autre enregistre le verset. La file est conservée
+    dans son propre fichier JSON.
+    """
+
+    def __init__(self, queue_file, settings=None):
+        self.queue_file = queue_file
+        self.settings = dict(DEFAULT_RERECORD_SETTINGS, **(settings or {}))
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._by_user = {}
+        self._by_verse = {}
+        # (assigned_at, user_id, verse_id) triés: les entrées expirées sont en tête
+        self._by_assigned = []
+
+        if self.queue_file.exists():
+            with open(self.queue_file, 'r', encoding='utf-8') as f:
+                for entry in json.load(f):
+                    self._index(entry)
+
+    def _index(self, entry):
+        key = (entry["user_id"], entry["verse_id"])
+        self._entries[key] = entry
+        self._by_user.setdefault(entry["user_id"], {})[entry["verse_id"]] = entry
+        self._by_verse.setdefault(entry["verse_id"], {})[entry["user_id"]] = entry
+        bisect.insort(self._by_assigned, (entry["assigned_at"], entry["user_id"], entry["verse_id"]))
+
+    def _unindex(self, user_id, verse_id):
+        entry = self._entries.pop((user_id, verse_id), None)
+        if entry is not None:
+            verses = self._by_user[user_id]
+            del verses[verse_id]
+            if not verses:
+                del self._by_user[user_id]
+            users = self._by_verse[verse_id]
+            del users[user_id]
+            if not users:
+                del self._by_verse[verse_id]
+            position = bisect.bisect_left(self._by_assigned, (entry["assigned_at"], user_id, verse_id))
+            del self._by_assigned[position]
+        return entry
+
+    def _save(self):
+        tmp_file = self.queue_file.with_suffix(".tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(list(self._entries.values()), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self.queue_file)
+
+    def add(self, user_id, verse, rejected_at=None, recording_id=None):
+        """Inscrire un verset rejeté; retourne False s'il était déjà dans la file."""
+        verse_id = str(verse["verse_id"])
+        with self._lock:
+            if (user_id, verse_id) in self._entries:
+                return False
+            now = datetime.now().isoformat()
+            self._index({
+                "user_id": user_id,
+                "verse_id": verse_id,
+                "sura": int(verse["sura"]),
+                "aya": int(verse["aya"]),
+                "recording_id": recording_id,
+                "rejected_at": rejected_at or now,
+                "assigned_at": now
+            })
+            self._save()
+            return True
+
+    def remove(self, user_id, verse_id):
+        """Retirer un verset de la file (réenregistré); retourne False s'il n'y était pas."""
+        with self._lock:
+            if self._unindex(user_id, str(verse_id)) is None:
+                return False
+            self._save()
+            return True
+
+    def remove_recorded(self, user_id, verse_id):
+        """Retirer les entrées satisfaites par un nouvel enregistrement d'un utilisateur.
+
+        Un enregistrement ne remplit qu'une place: seules l'entrée de
+        l'utilisateur et celle qui lui a été reprise par réattribution sont
+        retirées. Retourne le nombre d'entrées retirées.
+        """
+        verse_id = str(verse_id)
+        with self._lock:
+            users = [
+                owner for owner, entry in self._by_verse.get(verse_id, {}).items()
+                if owner == user_id or entry.get("reassigned_from") == user_id
+            ]
+            for owner in users:
+                self._unindex(owner, verse_id)
+            if users:
+                self._save()
+            return len(users)
+
+    def contains(self, user_id, verse_id):
+        return (user_id, str(verse_id)) in self._entries
+
+    def for_user(self, user_id):
+        """Versets à réenregistrer par un utilisateur, du plus ancien rejet au plus récent."""
+        with self._lock:
+            entries = list(self._by_user.get(user_id, {}).values())
+        return sorted(entries, key=lambda e: e["rejected_at"])
+
+    def next_for(self, user_id, exclude=(), recorded=(), is_full=None):
+        """Prochain verset à réenregistrer pour un utilisateur, ou None.
+
+        Les versets de l'utilisateur passent en premier. À défaut, le plus
+        ancien verset resté trop longtemps chez un autre contributeur lui est
+        réattribué, s'il ne l'a pas déjà enregistré. `is_full(verse_id)` écarte
+        les versets qui ont atteint le nombre maximum d'enregistrements: leurs
+        entrées sont retirées de la file.
+        """
+        with self._lock:
+            full = set()
+            own = []
+            for entry in self._by_user.get(user_id, {}).values():
+                if entry["verse_id"] in exclude:
+                    continue
+                if is_full and is_full(entry["verse_id"]):
+                    full.add(entry["verse_id"])
+                    continue
+                own.append(entry)
+            if own:
+                self._drop_verses(full)
+                return dict(min(own, key=lambda e: e["rejected_at"]))
+
+            hours = self.settings["reassign_after_hours"]
+            if not hours:
+                self._drop_verses(full)
+                return None
+            deadline = (datetime.now() - timedelta(hours=hours)).isoformat()
+            expired = []
+            for assigned_at, owner, verse_id in self._by_assigned:
+                # Tri par date d'attribution: les entrées suivantes sont dans le délai
+                if assigned_at > deadline:
+                    break
+                if (owner == user_id or verse_id in exclude or verse_id in recorded
+                        or (user_id, verse_id) in self._entries):
+                    continue
+                if is_full and (verse_id in full or is_full(verse_id)):
+                    full.add(verse_id)
+                    continue
+                expired.append(self._entries[(owner, verse_id)])
+            self._drop_verses(full)
+            if not expired:
+                return None
+
+            entry = min(expired, key=lambda e: e["rejected_at"])
+            self._unindex(entry["user_id"], entry["verse_id"])
+            # Le rejet garde sa priorité; le délai repart pour le nouveau contributeur
+            entry = dict(entry, user_id=user_id, reassigned_from=entry["user_id"], assigned_at=datetime.now().isoformat())
+            self._index(entry)
+            self._save()
+            return dict(entry)
+
+    def _drop_verses(self, verse_ids):
+        """Retirer les entrées des versets complets (appelé avec le verrou)."""
+        for verse_id in verse_ids:
+            for user_id in list(self._by_verse.get(verse_id, {})):
+                self._unindex(user_id, verse_id)
+        if verse_ids:
+            self._save()
+
+    def status(self):
+        with self._lock:
+            return {"pending": len(self._entries), "users": len(self._by_user)}
@@ -0,0 +1,92 @@
+import re
+import unicodedata
+from bisect import bisect_left
+
+# Lettres du mooré sans décomposition Unicode, ramenées à leur équivalent latin
+MOORE_LETTERS = str.maketrans({"ɛ": "e", "ɩ": "i", "ʋ": "u", "ɔ": "o", "ŋ": "n"})
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Longueur minimale d'un préfixe pour élargir la recherche aux mots qui le prolongent
+MIN_PREFIX_LENGTH = 2
+
+
+def normalize(text):
+    """Mettre en minuscules et retirer les accents (y compris les lettres propres au mooré)."""
+    text = unicodedata.normalize("NFKD", str(text).casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return text.translate(MOORE_LETTERS)
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(normalize(text))
+
+
+class VerseSearchIndex:
+    """Index inversé sur la traduction et les notes des versets.
+
+    Chaque mot normalisé renvoie vers l'ensemble des positions (ordre du
+    catalogue) des versets qui le contiennent. Le vocabulaire trié permet de
+    retrouver par dichotomie tous les mots commençant par un préfixe.
+    """
+
+    def __init__(self, verses_df):
+        self.verses = [
+            {
+                'id': verse.id,
+                'sura': verse.sura,
+                'aya': verse.aya,
+                'text': verse.translation
+            }
+            for verse in verses_df.itertuples(index=False)
+        ]
+        self.positions = {verse['id']: position for position, verse in enumerate(self.verses)}
+
+        self.postings = {}
+        for position, verse in enumerate(verses_df.itertuples(index=False)):
+            footnotes = verse.footnotes if isinstance(verse.footnotes, str) else ""
+            for token in set(tokenize(f"{verse.translation} {footnotes}")):
+                self.postings.setdefault(token, set()).add(position)
+        self.vocabulary = sorted(self.postings)
+
+    def get(self, verse_id):
+        """Obtenir un verset par son ID."""
+        position = self.positions.get(str(verse_id))
+        return self.verses[position] if position is not None else None
+
+    def _matching(self, term, prefix):
+        if not prefix or len(term) < MIN_PREFIX_LENGTH:
+            return self.postings.get(term, set())
+
+        matches = set()
+        start = bisect_left(self.vocabulary, term)
+        for word in self.vocabulary[start:]:
+            if not word.startswith(term):
+                break
+            matches |= self.postings[word]
+        return matches
+
+    def search(self, query, limit=20):
+        """Chercher les versets contenant tous les mots de la requête.
+
+        Le dernier mot est traité comme un préfixe (saisie en cours). Une
+        requête de la forme `2:255` renvoie directement le verset correspondant.
+        """
+        reference = re.fullmatch(r"\s*(\d+)\s*[:.]\s*(\d+)\s*", query or "")
+        if reference:
+            sura, aya = map(int, reference.groups())
+            return [v for v in self.verses if v['sura'] == sura and v['aya'] == aya][:limit]
+
+        terms = tokenize(query or "")
+        if not terms:
+            return []
+
+        result = None
+        # Les mots les plus longs sont les plus sélectifs: commencer par eux
+        for index, term in sorted(enumerate(terms), key=lambda item: -len(item[1])):
+            matches = self._matching(term, prefix=index == len(terms) - 1)
+            result = matches if result is None else result & matches
+            if not result:
+                return []
+
+        return [self.verses[position] for position in sorted(result)[:limit]]
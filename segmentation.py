@@ -0,0 +1,96 @@
+import numpy as np
+
+# Durée d'une trame d'analyse (en secondes)
+FRAME_SECONDS = 0.02
+
+# Durée minimale d'une pause entre deux versets (en secondes)
+MIN_PAUSE_SECONDS = 0.25
+
+
+def frame_energy_db(samples, sample_rate, frame_seconds=FRAME_SECONDS):
+    """Énergie (dB) de chaque trame, calculée en une seule opération vectorisée."""
+    frame = max(1, int(sample_rate * frame_seconds))
+    n_frames = len(samples) // frame
+    frames = samples[:n_frames * frame].reshape(n_frames, frame)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def find_pauses(energy_db, frame_seconds=FRAME_SECONDS, min_pause=MIN_PAUSE_SECONDS):
+    """Pauses intérieures (début, fin, en trames) assez longues pour séparer deux versets."""
+    if len(energy_db) == 0:
+        return np.array([], dtype=int), np.array([], dtype=int)
+
+    # Le seuil suit le bruit de fond de la prise, sans descendre trop loin sous le pic
+    threshold = max(np.percentile(energy_db, 10) + 10, energy_db.max() - 45)
+    silent = energy_db < threshold
+
+    edges = np.flatnonzero(np.diff(np.concatenate([[0], silent.astype(np.int8), [0]])))
+    starts, ends = edges[0::2], edges[1::2]
+
+    keep = ((ends - starts) * frame_seconds >= min_pause) & (starts > 0) & (ends < len(silent))
+    return starts[keep], ends[keep]
+
+
+def segment_verses(samples, sample_rate, expected_count, weights=None, min_pause=MIN_PAUSE_SECONDS):
+    """Découper une prise continue en `expected_count` segments (début, fin) en secondes.
+
+    Les coupures sont placées au milieu des pauses les plus longues. S'il y a
+    moins de pauses que nécessaire, les coupures manquantes sont réparties
+    proportionnellement à `weights` (par exemple la longueur du texte de
+    chaque verset).
+    """
+    duration = len(samples) / sample_rate
+    if expected_count <= 1:
+        return [(0.0, duration)]
+
+    energy_db = frame_energy_db(samples, sample_rate)
+    starts, ends = find_pauses(energy_db, min_pause=min_pause)
+    needed = expected_count - 1
+
+    # Garder les pauses les plus longues, puis les remettre dans l'ordre chronologique
+    longest = np.argsort(ends - starts)[::-1][:needed]
+    cuts = np.sort((starts[longest] + ends[longest]) / 2 * FRAME_SECONDS)
+
+    if len(cuts) < needed:
+        weights = np.asarray(weights if weights is not None else np.ones(expected_count), dtype=float)
+        expected = np.cumsum(weights)[:-1] / weights.sum() * duration
+        # Compléter avec les positions attendues les plus éloignées des coupures trouvées
+        distances = np.min(np.abs(expected[:, None] - cuts[None, :]), axis=1) if len(cuts) else np.full(len(expected), np.inf)
+        extra = expected[np.argsort(distances)[::-1][:needed - len(cuts)]]
+        cuts = np.sort(np.concatenate([cuts, extra]))
+
+    bounds = np.concatenate([[0.0], cuts, [duration]])
+    return [(float(start), float(end)) for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def validate_boundaries(boundaries, duration=None):
+    """Vérifier que les segments sont valides et ordonnés: 0 <= début < fin <= durée."""
+    previous_end = 0.0
+    for index, (start, end) in enumerate(boundaries, start=1):
+        if not 0 <= start < end:
+            raise ValueError(f"Segment {index}: bornes invalides ({start}-{end})")
+        if start < previous_end:
+            raise ValueError(f"Segment {index}: commence avant la fin du segment précédent ({start} < {previous_end})")
+        if duration is not None and end > duration:
+            raise ValueError(f"Segment {index}: dépasse la fin de la prise ({end} > {duration:.2f})")
+        previous_end = end
+
+
+def parse_boundaries(text):
+    """Lire des bornes saisies par l'administrateur: une ligne `début-fin` par verset."""
+    boundaries = []
+    for line in text.strip().splitlines():
+        # Les lignes vides (ou d'espaces) sont ignorées
+        if not line.strip():
+            continue
+        # Les lignes peuvent commencer par un libellé: "2:255  12.40-18.75"
+        span = line.split()[-1]
+        try:
+            start, end = span.split("-")
+            start, end = float(start), float(end)
+        except ValueError:
+            raise ValueError(f"Ligne illisible (format attendu: début-fin): {line}")
+        boundaries.append((start, end))
+    validate_boundaries(boundaries)
+    return boundaries
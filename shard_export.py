@@ -0,0 +1,202 @@
+"""Export des enregistrements approuvés en fragments tar de type WebDataset.
+
+Chaque échantillon est stocké sous forme de deux membres consécutifs partageant
+la même clé: `<id>.wav` et `<id>.json` (verset, sourate, aya, traduction,
+genre, utilisateur). Les fragments ont une taille cible fixe et peuvent être
+lus séquentiellement par les chargeurs de données d'entraînement:
+
+    python shard_export.py --output shards --shard-size-mb 256 --val-fraction 0.05 [--catalog moore]
+"""
+import argparse
+import io
+import json
+import os
+import random
+import shutil
+import tarfile
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+
+def split_by_speaker(recordings, val_fraction, seed):
+    """Répartir train/validation par locuteur: aucun locuteur n'est dans les deux ensembles.
+
+    Les locuteurs sont parcourus dans un ordre aléatoire; un locuteur passe en
+    validation si cela rapproche la validation de `val_fraction` des
+    enregistrements. Il reste toujours au moins un locuteur en entraînement.
+    """
+    rng = random.Random(seed)
+    by_speaker = {}
+    for recording in sorted(recordings, key=lambda r: r["id"]):
+        by_speaker.setdefault(recording["user_id"], []).append(recording)
+
+    speakers = sorted(by_speaker)
+    rng.shuffle(speakers)
+    target = round(len(recordings) * val_fraction)
+    train, validation = [], []
+    for index, speaker in enumerate(speakers):
+        items = by_speaker[speaker]
+        closer = abs(len(validation) + len(items) - target) < abs(len(validation) - target)
+        if closer and index < len(speakers) - 1:
+            validation.extend(items)
+        else:
+            train.extend(items)
+
+    # Mélange déterministe global pour que chaque fragment mélange les locuteurs
+    rng.shuffle(train)
+    rng.shuffle(validation)
+    return train, validation
+
+
+def plan_shards(samples, shard_size_bytes):
+    """Regrouper les échantillons en fragments d'environ `shard_size_bytes`."""
+    shards, current, current_size = [], [], 0
+    for sample in samples:
+        size = os.path.getsize(sample["audio_path"])
+        if current and current_size + size > shard_size_bytes:
+            shards.append(current)
+            current, current_size = [], 0
+        current.append(sample)
+        current_size += size
+    if current:
+        shards.append(current)
+    return shards
+
+
+def _add_member(tar, name, data):
+    member = tarfile.TarInfo(name)
+    member.size = len(data)
+    # Attributs fixes pour que deux exports identiques produisent les mêmes octets
+    member.mtime = 0
+    member.uid = member.gid = 0
+    member.uname = member.gname = ""
+    tar.addfile(member, io.BytesIO(data))
+
+
+def write_shard(shard_path, samples):
+    """Écrire un fragment tar (exécuté dans un processus du pool)."""
+    tmp_path = f"{shard_path}.tmp"
+    # PAX: les clés (identifiants d'enregistrement) peuvent dépasser les 100 caractères de USTAR
+    with tarfile.open(tmp_path, "w", format=tarfile.PAX_FORMAT) as tar:
+        for sample in samples:
+            key = sample["key"]
+            with open(sample["audio_path"], 'rb') as f:
+                _add_member(tar, f"{key}.wav", f.read())
+            _add_member(tar, f"{key}.json", json.dumps(sample["json"], ensure_ascii=False).encode("utf-8"))
+    os.replace(tmp_path, shard_path)
+    return Path(shard_path).name, len(samples)
+
+
+def _current_umask():
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+def export_shards(metadata, translations, output_dir, shard_size_mb=256, val_fraction=0.05, seed=0, max_workers=None,
+                  overwrite=False):
+    """Exporter les enregistrements approuvés en fragments tar train/validation.
+
+    L'export est écrit dans un dossier temporaire voisin puis substitué au
+    dossier de sortie: un lecteur voit l'export précédent complet ou le
+    nouveau, jamais un mélange des deux. Le dossier de sortie est entièrement
+    remplacé: un dossier non vide qui ne contient pas d'export précédent
+    (`manifest.json`) n'est remplacé qu'avec `overwrite`.
+    """
+    output_dir = Path(output_dir)
+    if (output_dir.is_dir() and any(output_dir.iterdir()) and not (output_dir / "manifest.json").exists()
+            and not overwrite):
+        raise ValueError(f"{output_dir} n'est pas vide et ne contient pas d'export précédent (utilisez --overwrite)")
+    output_dir.parent.mkdir(parents=True, exist_ok=True)
+    staging_dir = Path(tempfile.mkdtemp(prefix=f".{output_dir.name}.", dir=output_dir.parent))
+    # mkdtemp crée le dossier en 0700: appliquer les droits habituels (umask) au dossier publié
+    os.chmod(staging_dir, 0o777 & ~_current_umask())
+
+    recordings = [
+        r for r in metadata["recordings"]
+        if r["status"] == "approved" and os.path.exists(r["audio_path"])
+    ]
+    train, validation = split_by_speaker(recordings, val_fraction, seed)
+
+    jobs = []
+    manifest = {"seed": seed, "val_fraction": val_fraction, "shard_size_mb": shard_size_mb, "splits": {}}
+    for split, split_recordings in (("train", train), ("validation", validation)):
+        samples = [
+            {
+                "key": r["id"].replace(".", "_"),
+                "audio_path": r["audio_path"],
+                "json": {
+                    "recording_id": r["id"],
+                    "verse_id": r["verse_id"],
+                    "sura": int(r["sura"]),
+                    "aya": int(r["aya"]),
+                    "translation": translations.get(str(r["verse_id"]), ""),
+                    "gender": r["gender"],
+                    "user_id": r["user_id"]
+                }
+            }
+            for r in split_recordings
+        ]
+        shards = plan_shards(samples, shard_size_mb * 1024 * 1024)
+        manifest["splits"][split] = {
+            "samples": len(samples),
+            "speakers": len({r["user_id"] for r in split_recordings}),
+            "shards": []
+        }
+        for index, shard in enumerate(shards):
+            jobs.append((split, str(staging_dir / f"{split}-{index:06d}.tar"), shard))
+
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(write_shard, [job[1] for job in jobs], [job[2] for job in jobs])
+            for (split, _, _), (name, count) in zip(jobs, results):
+                manifest["splits"][split]["shards"].append({"file": name, "samples": count})
+
+        with open(staging_dir / "manifest.json", 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+    except Exception:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+
+    # Substitution par renommages (même système de fichiers): l'ancien export reste intact jusqu'au bout
+    previous_dir = None
+    if output_dir.exists():
+        previous_dir = Path(tempfile.mkdtemp(prefix=f".{output_dir.name}.old.", dir=output_dir.parent))
+        os.replace(output_dir, previous_dir / output_dir.name)
+    os.replace(staging_dir, output_dir)
+    if previous_dir is not None:
+        shutil.rmtree(previous_dir, ignore_errors=True)
+    return manifest
+
+
+def main():
+    from catalogs import CatalogRegistry
+
+    parser = argparse.ArgumentParser(description="Export des enregistrements approuvés en fragments tar")
+    parser.add_argument("--output", default="shards", help="Dossier de sortie")
+    parser.add_argument("--shard-size-mb", type=int, default=256, help="Taille cible d'un fragment (Mo)")
+    parser.add_argument("--val-fraction", type=float, default=0.05, help="Part approximative des enregistrements en validation (locuteurs distincts)")
+    parser.add_argument("--seed", type=int, default=0, help="Graine du mélange")
+    parser.add_argument("--workers", type=int, default=None, help="Nombre de processus")
+    parser.add_argument("--catalog", default=None, help="Projet à exporter (projet par défaut si absent)")
+    parser.add_argument("--overwrite", action="store_true", help="Remplacer un dossier de sortie qui ne contient pas d'export précédent")
+    args = parser.parse_args()
+
+    catalog = CatalogRegistry().get(args.catalog)
+    manifest = export_shards(
+        catalog.data_manager._load_full_metadata(),
+        catalog.translations(),
+        args.output,
+        shard_size_mb=args.shard_size_mb,
+        val_fraction=args.val_fraction,
+        seed=args.seed,
+        max_workers=args.workers,
+        overwrite=args.overwrite
+    )
+    for split, info in manifest["splits"].items():
+        print(f"{split}: {info['samples']} échantillons dans {len(info['shards'])} fragment(s)")
+
+
+if __name__ == "__main__":
+    main()
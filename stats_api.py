@@ -0,0 +1,154 @@
+import json
+import threading
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Request, Response
+from http_cache import make_etag, not_modified
+from recording_status import is_active
+
+# Durée pendant laquelle un client peut réutiliser une réponse sans revalidation
+CACHE_MAX_AGE = 30
+
+
+class StatsSnapshots:
+    """Instantanés précalculés de la progression, de la couverture et du classement.
+
+    Les instantanés d'un projet sont recalculés en arrière-plan après chaque
+    écriture de ses métadonnées; les requêtes HTTP ne lisent que la version en
+    mémoire, déjà sérialisée en JSON avec son ETag. Le premier calcul n'a lieu
+    qu'à la première requête, ce qui laisse le catalogue du projet non chargé
+    tant que personne ne le consulte.
+    """
+
+    def __init__(self, catalog, get_contributors_stats):
+        self.catalog = catalog
+        self.verses_per_sura = None
+        self.get_contributors_stats = get_contributors_stats
+        self._snapshots = {}
+        self._lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._refreshing = False
+
+    def get(self, name):
+        """Retourner (corps JSON, ETag) d'un instantané; lance le premier calcul si besoin."""
+        with self._lock:
+            snapshot = self._snapshots.get(name)
+        if snapshot is None:
+            self.invalidate()
+        return snapshot
+
+    def invalidate(self):
+        """Demander un recalcul (appelé après chaque sauvegarde des métadonnées)."""
+        self._dirty.set()
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh_loop, name="stats-snapshots", daemon=True).start()
+
+    def _refresh_loop(self):
+        # Les écritures arrivées pendant un recalcul déclenchent un unique recalcul supplémentaire
+        while True:
+            while self._dirty.is_set():
+                self._dirty.clear()
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"Erreur lors du calcul des statistiques publiques: {str(e)}")
+            with self._lock:
+                if not self._dirty.is_set():
+                    self._refreshing = False
+                    return
+
+    def refresh(self):
+        """Recalculer tous les instantanés depuis les métadonnées."""
+        if self.verses_per_sura is None:
+            verses_df = self.catalog.verses_df
+            self.verses_per_sura = verses_df.groupby('sura')['id'].apply(list).to_dict() if verses_df is not None else {}
+        data_manager = self.catalog.data_manager
+        metadata = data_manager._load_full_metadata()
+        max_recordings = data_manager.get_max_recordings()
+        generated_at = datetime.now().isoformat()
+
+        approved_per_verse = {}
+        for recording in metadata["recordings"]:
+            if recording["status"] == "approved":
+                approved_per_verse[recording["verse_id"]] = approved_per_verse.get(recording["verse_id"], 0) + 1
+
+        coverage = []
+        for sura, verse_ids in sorted(self.verses_per_sura.items()):
+            counts = [min(approved_per_verse.get(v, 0), max_recordings) for v in verse_ids]
+            target = len(verse_ids) * max_recordings
+            coverage.append({
+                "sura": int(sura),
+                "verses": len(verse_ids),
+                "verses_started": sum(1 for c in counts if c > 0),
+                "verses_complete": sum(1 for c in counts if c >= max_recordings),
+                "approved_recordings": sum(counts),
+                "target_recordings": target,
+                "percent_complete": round(100 * sum(counts) / target, 2) if target else 0.0
+            })
+
+        total_target = sum(s["target_recordings"] for s in coverage)
+        total_done = sum(s["approved_recordings"] for s in coverage)
+        progress = {
+            "total_recordings": sum(1 for r in metadata["recordings"] if is_active(r)),
+            "approved_recordings": sum(1 for r in metadata["recordings"] if r["status"] == "approved"),
+            "pending_recordings": sum(1 for r in metadata["recordings"] if r["status"] == "pending"),
+            "contributors": len(metadata["users"]),
+            "verses": sum(s["verses"] for s in coverage),
+            "verses_complete": sum(s["verses_complete"] for s in coverage),
+            "max_recordings_per_verse": max_recordings,
+            "percent_complete": round(100 * total_done / total_target, 2) if total_target else 0.0
+        }
+
+        leaderboard = [
+            {
+                "username": c["username"],
+                "rank": c["rank"],
+                "approved_recordings": c["approved_recordings"],
+                "pending_recordings": c["pending_recordings"],
+                "last_contribution": c["last_contribution"]
+            }
+            for c in self.get_contributors_stats(metadata)
+        ]
+
+        snapshots = {}
+        for name, payload in (("progress", progress), ("coverage", coverage), ("leaderboard", leaderboard)):
+            body = json.dumps({"generated_at": generated_at, "data": payload}, ensure_ascii=False).encode("utf-8")
+            # L'ETag ne dépend que des données: un recalcul sans changement garde le même ETag
+            etag = make_etag(json.dumps(payload, sort_keys=True, ensure_ascii=False))
+            current = self._snapshots.get(name)
+            snapshots[name] = current if current and current[1] == etag else (body, etag)
+
+        with self._lock:
+            self._snapshots = snapshots
+
+
+def create_stats_router(snapshots):
+    """Routes JSON en lecture seule servies depuis les instantanés."""
+    router = APIRouter(prefix="/api")
+
+    def serve(name, request):
+        snapshot = snapshots.get(name)
+        if snapshot is None:
+            raise HTTPException(status_code=503, detail="Statistiques en cours de calcul", headers={"Retry-After": "5"})
+
+        body, etag = snapshot
+        headers = {"ETag": etag, "Cache-Control": f"public, max-age={CACHE_MAX_AGE}"}
+        if not_modified(request, etag):
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type="application/json", headers=headers)
+
+    @router.get("/progress")
+    def progress(request: Request):
+        return serve("progress", request)
+
+    @router.get("/coverage")
+    def coverage(request: Request):
+        return serve("coverage", request)
+
+    @router.get("/leaderboard")
+    def leaderboard(request: Request):
+        return serve("leaderboard", request)
+
+    return router
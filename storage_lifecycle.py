@@ -0,0 +1,236 @@
+import io
+import os
+import tarfile
+import threading
+import time
+from datetime import datetime, timedelta
+import soundfile as sf
+from recording_status import INACTIVE_STATUSES
+
+# Valeurs par défaut, remplaçables dans config.json (section "storage")
+DEFAULT_STORAGE_SETTINGS = {
+    "grace_days": 7,          # Délai avant l'archivage d'un enregistrement rejeté ou remplacé
+    "retention_days": 180     # Durée de conservation des archives avant suppression définitive
+}
+
+
+def _parse_date(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+class StorageLifecycle:
+    """Archivage à froid des enregistrements rejetés ou remplacés.
+
+    Les fichiers concernés sont convertis en FLAC et regroupés dans une archive
+    tar par passage, dans `cold_storage/`. Les métadonnées gardent un pointeur
+    (`archive`) vers l'archive et le membre correspondant, ce qui permet de
+    restaurer le fichier à la demande. Les archives plus anciennes que la
+    durée de rétention sont supprimées.
+    """
+
+    def __init__(self, data_manager, settings=None):
+        self.data_manager = data_manager
+        self.settings = dict(DEFAULT_STORAGE_SETTINGS, **(settings or {}))
+        self.cold_dir = data_manager.base_dir / "cold_storage"
+        self.cold_dir.mkdir(exist_ok=True)
+        self._run_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._worker = None
+
+    def _candidates(self, metadata, now):
+        """Enregistrements et prises dont le fichier peut quitter le stockage principal."""
+        grace = timedelta(days=self.settings["grace_days"])
+        recordings = [r for r in metadata["recordings"] if "archive" not in r and os.path.exists(r["audio_path"])]
+
+        # Un enregistrement non approuvé est remplacé si l'utilisateur a enregistré le même verset depuis
+        latest = {}
+        for recording in metadata["recordings"]:
+            key = (recording["user_id"], recording["verse_id"])
+            if key not in latest or recording["timestamp"] > latest[key]["timestamp"]:
+                latest[key] = recording
+
+        selected = []
+        for recording in recordings:
+            newer = latest[(recording["user_id"], recording["verse_id"])]
+            if recording["status"] in INACTIVE_STATUSES:
+                since = (_parse_date(recording.get("rejected_at")) or _parse_date(recording.get("removed_at"))
+                         or _parse_date(recording["timestamp"]))
+            elif recording["status"] != "approved" and newer["id"] != recording["id"]:
+                since = _parse_date(newer["timestamp"])
+            else:
+                continue
+            # Un fichier restauré à la demande reste disponible pendant un nouveau délai de grâce
+            since = max(since, _parse_date(recording.get("restored_at")) or since)
+            if now - since >= grace:
+                selected.append(("recording", recording["id"], recording["audio_path"]))
+
+        # Une prise multi-versets n'est plus utile une fois tous ses extraits traités
+        for take_id, take in metadata.get("takes", {}).items():
+            if "archive" in take or not os.path.exists(take["audio_path"]):
+                continue
+            pending = any(
+                r["status"] == "pending" for r in metadata["recordings"]
+                if r["id"] in take["recording_ids"]
+            )
+            since = max(_parse_date(take["timestamp"]), _parse_date(take.get("restored_at")) or datetime.min)
+            if not pending and now - since >= grace:
+                selected.append(("take", take_id, take["audio_path"]))
+
+        return selected
+
+    def run(self, now=None):
+        """Archiver les fichiers éligibles puis supprimer les archives expirées."""
+        if not self._run_lock.acquire(blocking=False):
+            return {"archived": 0, "purged_archives": 0}
+
+        try:
+            now = now or datetime.now()
+            data_manager = self.data_manager
+            candidates = self._candidates(data_manager._load_full_metadata(), now)
+
+            archived = {}
+            if candidates:
+                archive_path = self.cold_dir / f"archive_{now.strftime('%Y%m%d_%H%M%S')}.tar"
+                frames = {}
+                with tarfile.open(archive_path, "w") as tar:
+                    for kind, item_id, audio_path in candidates:
+                        data, sample_rate = sf.read(audio_path)
+                        buffer = io.BytesIO()
+                        sf.write(buffer, data, sample_rate, format="FLAC")
+                        # libsndfile revient au début du tampon en finalisant le FLAC: tell() ne donne pas la taille
+                        member = tarfile.TarInfo(f"{item_id}.flac")
+                        member.size = len(buffer.getvalue())
+                        member.mtime = time.time()
+                        buffer.seek(0)
+                        tar.addfile(member, buffer)
+                        frames[member.name] = len(data)
+                        archived[(kind, item_id)] = {
+                            "archive": str(archive_path),
+                            "member": member.name,
+                            "archived_at": now.isoformat()
+                        }
+
+                # Seuls les fichiers relus intégralement depuis l'archive quittent le stockage principal
+                verified = self._verify_archive(archive_path, frames)
+                archived = {key: pointer for key, pointer in archived.items() if pointer["member"] in verified}
+
+            # Les pointeurs sont écrits avant la suppression des fichiers du stockage principal
+            to_delete = []
+            with data_manager._metadata_lock:
+                metadata = data_manager._load_full_metadata()
+                current = {(kind, item_id) for kind, item_id, _ in self._candidates(metadata, now)}
+                for recording in metadata["recordings"]:
+                    key = ("recording", recording["id"])
+                    if key in archived and key in current:
+                        recording["archive"] = archived[key]
+                        to_delete.append((key, recording["audio_path"]))
+                for take_id, take in metadata.get("takes", {}).items():
+                    key = ("take", take_id)
+                    if key in archived and key in current:
+                        take["archive"] = archived[key]
+                        to_delete.append((key, take["audio_path"]))
+
+                purged = self._purge_expired(metadata, now)
+                if to_delete or purged:
+                    data_manager.save_metadata(metadata)
+
+            for (kind, item_id), audio_path in to_delete:
+                os.remove(audio_path)
+                if kind == "recording":
+                    data_manager.previews.remove(item_id)
+            for archive_path in purged:
+                os.remove(archive_path)
+
+            return {"archived": len(to_delete), "purged_archives": len(purged)}
+        finally:
+            self._run_lock.release()
+
+    def _verify_archive(self, archive_path, frames):
+        """Relire l'archive terminée; retourne les membres décodés avec le bon nombre de trames."""
+        verified = set()
+        try:
+            with tarfile.open(archive_path, "r") as tar:
+                for member in tar.getmembers():
+                    try:
+                        data, _ = sf.read(io.BytesIO(tar.extractfile(member).read()))
+                    except Exception as e:
+                        print(f"Membre d'archive illisible {member.name}: {str(e)}")
+                        continue
+                    if frames.get(member.name) == len(data):
+                        verified.add(member.name)
+                    else:
+                        print(f"Membre d'archive incomplet {member.name}: {len(data)} trames au lieu de {frames.get(member.name)}")
+        except Exception as e:
+            print(f"Archive illisible {archive_path}: {str(e)}")
+        return verified
+
+    def _purge_expired(self, metadata, now):
+        """Marquer comme purgés les pointeurs des archives expirées; retourne les archives à supprimer."""
+        retention = timedelta(days=self.settings["retention_days"])
+        expired = set()
+        for archive_path in self.cold_dir.glob("archive_*.tar"):
+            created = datetime.fromtimestamp(archive_path.stat().st_mtime)
+            if now - created >= retention:
+                expired.add(str(archive_path))
+
+        if expired:
+            items = list(metadata["recordings"]) + list(metadata.get("takes", {}).values())
+            for item in items:
+                pointer = item.get("archive")
+                if pointer and pointer["archive"] in expired:
+                    pointer["purged_at"] = now.isoformat()
+        return sorted(expired)
+
+    def _restore(self, item):
+        pointer = item.get("archive")
+        if not pointer:
+            raise ValueError("Ce fichier n'est pas archivé")
+        if pointer.get("purged_at") or not os.path.exists(pointer["archive"]):
+            raise ValueError("L'archive de ce fichier a été supprimée (durée de rétention dépassée)")
+
+        with tarfile.open(pointer["archive"], "r") as tar:
+            buffer = io.BytesIO(tar.extractfile(pointer["member"]).read())
+        data, sample_rate = sf.read(buffer)
+        tmp_path = f"{item['audio_path']}.tmp"
+        sf.write(tmp_path, data, sample_rate, subtype="PCM_16", format="WAV")
+        os.replace(tmp_path, item["audio_path"])
+        item["restored_from"] = item.pop("archive")
+        item["restored_at"] = datetime.now().isoformat()
+
+    def restore_recording(self, recording_id):
+        """Remettre le fichier d'un enregistrement archivé dans le stockage principal."""
+        with self.data_manager._metadata_lock:
+            metadata = self.data_manager._load_full_metadata()
+            recording = next((r for r in metadata["recordings"] if r["id"] == recording_id), None)
+            if recording is None:
+                raise ValueError(f"Enregistrement introuvable: {recording_id}")
+            self._restore(recording)
+            self.data_manager.save_metadata(metadata)
+
+    def restore_take(self, take_id):
+        """Remettre une prise multi-versets archivée dans le stockage principal."""
+        with self.data_manager._metadata_lock:
+            metadata = self.data_manager._load_full_metadata()
+            take = metadata.get("takes", {}).get(take_id)
+            if take is None:
+                raise ValueError(f"Prise introuvable: {take_id}")
+            self._restore(take)
+            self.data_manager.save_metadata(metadata)
+
+    def start(self, interval=86400):
+        """Lancer le nettoyage périodique du stockage en arrière-plan."""
+        if self._worker and self._worker.is_alive():
+            return
+
+        def run():
+            while not self._stop_event.wait(interval):
+                try:
+                    self.run()
+                except Exception as e:
+                    print(f"Erreur lors du nettoyage du stockage: {str(e)}")
+
+        self._worker = threading.Thread(target=run, name="storage-lifecycle", daemon=True)
+        self._worker.start()
+
+    def stop(self):
+        self._stop_event.set()
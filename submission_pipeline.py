@@ -0,0 +1,279 @@
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+import soundfile as sf
+from admission import AdmissionController
+from segmentation import segment_verses
+
+# États possibles d'une soumission
+QUEUED = "queued"
+PROCESSING = "processing"
+DONE = "done"
+FAILED = "failed"
+
+# Soumissions terminées dont l'état reste consultable après la suppression de leur fichier
+SETTLED_JOBS_KEPT = 1000
+
+
+class SubmissionPipeline:
+    """Chaîne de traitement asynchrone des enregistrements.
+
+    `submit` copie l'audio reçu dans `audio_recordings/incoming/` et écrit le
+    travail dans `jobs/` avant de rendre la main: l'enregistrement est alors
+    durablement stocké. La conversion audio et l'indexation dans les
+    métadonnées sont faites par un pool de threads borné; la publication sur
+    HuggingFace est confiée à la file HubSync. Le fichier d'un travail terminé
+    est supprimé, son issue restant consultable en mémoire.
+    """
+
+    def __init__(self, data_manager, max_workers=2, admission_settings=None):
+        self.data_manager = data_manager
+        self.jobs_dir = data_manager.base_dir / "jobs"
+        self.incoming_dir = data_manager.audio_dir / "incoming"
+        self.takes_dir = data_manager.audio_dir / "takes"
+        self.jobs_dir.mkdir(exist_ok=True)
+        self.incoming_dir.mkdir(exist_ok=True)
+        self.takes_dir.mkdir(exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="submission")
+        self._jobs_lock = threading.Lock()
+        self._settled = OrderedDict()
+        self.admission = AdmissionController(data_manager.audio_dir, admission_settings)
+
+    def _job_file(self, job_id):
+        return self.jobs_dir / f"{job_id}.json"
+
+    def _write_job(self, job):
+        job["updated_at"] = datetime.now().isoformat()
+        tmp_file = self._job_file(job["id"]).with_suffix(".tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(job, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self._job_file(job["id"]))
+
+    def get_job(self, job_id):
+        """Obtenir l'état d'une soumission."""
+        try:
+            with open(self._job_file(job_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return self._settled.get(job_id)
+
+    def _update_job(self, job_id, **changes):
+        with self._jobs_lock:
+            job = self.get_job(job_id)
+            job.update(changes)
+            self._write_job(job)
+            return job
+
+    def _settle(self, job):
+        """Garder l'issue d'un travail terminé en mémoire et supprimer son fichier."""
+        with self._jobs_lock:
+            self._settled[job["id"]] = job
+            while len(self._settled) > SETTLED_JOBS_KEPT:
+                self._settled.popitem(last=False)
+            self._job_file(job["id"]).unlink(missing_ok=True)
+        # L'audio reçu d'une soumission en échec ne sera plus traité
+        if job["status"] == FAILED and os.path.exists(job["raw_path"]):
+            os.remove(job["raw_path"])
+
+    def _store_raw(self, audio_data, job_id):
+        """Copier l'audio reçu dans `incoming/` et forcer son écriture sur disque."""
+        if isinstance(audio_data, (str, os.PathLike)):
+            raw_path = self.incoming_dir / f"{job_id}{Path(audio_data).suffix or '.wav'}"
+            shutil.copyfile(audio_data, raw_path)
+        else:
+            raw_path = self.incoming_dir / f"{job_id}.wav"
+            audio_data.save(str(raw_path))
+        with open(raw_path, 'rb') as f:
+            os.fsync(f.fileno())
+        return raw_path
+
+    def store(self, audio_data, user_id, verse_info):
+        """Stocker durablement l'audio reçu et créer le travail correspondant."""
+        now = datetime.now()
+        timestamp = now.strftime('%Y%m%d_%H%M%S_%f')
+        recording_id = f"rec_{timestamp}_{user_id}"
+        raw_path = self._store_raw(audio_data, recording_id)
+
+        job = {
+            "id": recording_id,
+            "recording_id": recording_id,
+            "user_id": user_id,
+            "verse": {
+                "id": str(verse_info['id']),
+                "sura": int(verse_info['sura']),
+                "aya": int(verse_info['aya'])
+            },
+            "raw_path": str(raw_path),
+            "audio_path": str(self.data_manager.audio_dir / f"{user_id}_sura{verse_info['sura']}_aya{verse_info['aya']}_{timestamp}.wav"),
+            "timestamp": now.isoformat(),
+            "status": QUEUED,
+            "error": None,
+            "created_at": now.isoformat()
+        }
+        with self._jobs_lock:
+            self._write_job(job)
+        return job
+
+    def store_take(self, audio_data, user_id, verses):
+        """Stocker une prise couvrant plusieurs versets (sourate entière ou plage d'ayat)."""
+        now = datetime.now()
+        timestamp = now.strftime('%Y%m%d_%H%M%S_%f')
+        take_id = f"take_{timestamp}_{user_id}"
+        raw_path = self._store_raw(audio_data, take_id)
+
+        job = {
+            "id": take_id,
+            "kind": "take",
+            "take_id": take_id,
+            "user_id": user_id,
+            "verses": [
+                {
+                    "id": str(v['id']),
+                    "sura": int(v['sura']),
+                    "aya": int(v['aya']),
+                    "weight": max(1, len(str(v.get('text', ''))))
+                }
+                for v in verses
+            ],
+            "raw_path": str(raw_path),
+            "audio_path": str(self.takes_dir / f"{take_id}.wav"),
+            "timestamp": now.isoformat(),
+            "status": QUEUED,
+            "error": None,
+            "created_at": now.isoformat()
+        }
+        with self._jobs_lock:
+            self._write_job(job)
+        return job
+
+    def submit_take(self, audio_data, user_id, verses):
+        """Accepter une prise multi-versets; le découpage est fait en arrière-plan."""
+        self.admission.admit(user_id)
+        try:
+            job = self.store_take(audio_data, user_id, verses)
+        except Exception:
+            self.admission.release()
+            raise
+        self._executor.submit(self._run_admitted, job["id"])
+        return job
+
+    def submit(self, audio_data, user_id, verse_info):
+        """Accepter un enregistrement et planifier son traitement en arrière-plan.
+        
+        Lève SubmissionRejected si la file est pleine, si l'utilisateur soumet
+        trop vite ou si l'espace disque est insuffisant.
+        """
+        self.admission.admit(user_id)
+        try:
+            job = self.store(audio_data, user_id, verse_info)
+        except Exception:
+            self.admission.release()
+            raise
+        self._executor.submit(self._run_admitted, job["id"])
+        return job
+
+    def _run_admitted(self, job_id):
+        try:
+            return self.run(job_id)
+        finally:
+            self.admission.release()
+
+    def run(self, job_id):
+        """Traiter une soumission: conversion audio, indexation, aperçu puis demande de publication."""
+        job = self._update_job(job_id, status=PROCESSING)
+        try:
+            # Une reprise après interruption peut trouver l'audio déjà converti
+            if not os.path.exists(job["audio_path"]):
+                self._process_audio(job["raw_path"], job["audio_path"])
+
+            if job.get("kind") == "take":
+                recordings = self._segment_take(job)
+            else:
+                self.data_manager.index_recording(job)
+                recordings = [(job["recording_id"], job["audio_path"])]
+
+            if os.path.exists(job["raw_path"]):
+                os.remove(job["raw_path"])
+            job = self._update_job(job_id, status=DONE)
+        except Exception as e:
+            print(f"Erreur lors du traitement de l'enregistrement {job_id}: {str(e)}")
+            job = self._update_job(job_id, status=FAILED, error=str(e))
+            self._settle(job)
+            return job
+        self._settle(job)
+
+        # Aperçus compressés pour la revue par l'administrateur
+        for recording_id, audio_path in recordings:
+            try:
+                self.data_manager.previews.generate(recording_id, audio_path)
+            except Exception as e:
+                print(f"Erreur lors de la génération de l'aperçu {recording_id}: {str(e)}")
+
+        # Index des caractéristiques audio mis à jour en arrière-plan
+        try:
+            self.data_manager.audio_index.request_update()
+        except Exception as e:
+            print(f"Erreur lors de la mise à jour de l'index audio: {str(e)}")
+
+        # Publication envoyée en arrière-plan par la file HubSync, hors du créneau d'admission
+        try:
+            self.data_manager.request_sync()
+        except Exception as e:
+            print(f"Erreur lors de la synchronisation avec HuggingFace: {str(e)}")
+        return job
+
+    def _segment_take(self, job):
+        """Découper une prise en un extrait par verset et les indexer."""
+        data, sample_rate = sf.read(job["audio_path"], dtype="float32", always_2d=True)
+        boundaries = segment_verses(
+            data.mean(axis=1),
+            sample_rate,
+            len(job["verses"]),
+            weights=[v["weight"] for v in job["verses"]]
+        )
+        clip_paths = [
+            str(self.data_manager.audio_dir / f"{job['user_id']}_sura{v['sura']}_aya{v['aya']}_{job['take_id'][len('take_'):]}.wav")
+            for v in job["verses"]
+        ]
+        self.cut_clips(job["audio_path"], boundaries, clip_paths)
+        return self.data_manager.index_take(job, boundaries, clip_paths)
+
+    def cut_clips(self, take_path, boundaries, clip_paths):
+        """Écrire un fichier WAV par segment (début, fin) de la prise."""
+        data, sample_rate = sf.read(take_path, dtype="float32")
+        for (start, end), clip_path in zip(boundaries, clip_paths):
+            clip = data[int(start * sample_rate):int(end * sample_rate)]
+            tmp_path = f"{clip_path}.tmp"
+            sf.write(tmp_path, clip, sample_rate, subtype="PCM_16", format="WAV")
+            os.replace(tmp_path, clip_path)
+
+    def _process_audio(self, raw_path, audio_path):
+        """Convertir l'audio reçu en WAV PCM 16 bits."""
+        data, sample_rate = sf.read(raw_path)
+        if len(data) == 0:
+            raise ValueError("Enregistrement audio vide")
+        tmp_path = f"{audio_path}.tmp"
+        sf.write(tmp_path, data, sample_rate, subtype="PCM_16", format="WAV")
+        os.replace(tmp_path, audio_path)
+
+    def recover(self):
+        """Replanifier les soumissions interrompues par un redémarrage.
+
+        Les fichiers de travaux déjà terminés (arrêt juste avant leur
+        suppression) sont nettoyés au passage.
+        """
+        for job_file in self.jobs_dir.glob("*.json"):
+            with open(job_file, 'r', encoding='utf-8') as f:
+                job = json.load(f)
+            if job["status"] in (QUEUED, PROCESSING):
+                self.admission.track()
+                self._executor.submit(self._run_admitted, job["id"])
+            else:
+                self._settle(job)